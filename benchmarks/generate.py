@@ -0,0 +1,116 @@
+"""
+Generate synthetic data directories (and matching models) for benchmarking.
+
+Tables cycle through the supported layouts (a directory of YAML files, a
+single `_all.yml` file, and a directory of Markdown files), and each table
+references the one generated before it so that loading has to follow a
+chain of foreign keys.
+"""
+
+from pathlib import Path
+
+from sqlalchemy import Column, ForeignKey, Integer, String, Text
+
+LAYOUTS = ('yaml', 'all', 'markdown')
+
+
+def table_name(index: int):
+    return 'table_{:03d}'.format(index)
+
+
+def layout_for(index: int):
+    return LAYOUTS[index % len(LAYOUTS)]
+
+
+def make_models(db, tables: int):
+    models = []
+
+    for index in range(tables):
+        attrs = {
+            '__tablename__': table_name(index),
+            'slug': Column(String(255), primary_key=True),
+            'title': Column(String(255), nullable=False),
+            'position': Column(Integer, nullable=False),
+            'content': Column(Text, default=None),
+        }
+
+        if index > 0:
+            attrs['parent_slug'] = Column(
+                String(255),
+                ForeignKey('{}.slug'.format(table_name(index - 1))),
+                nullable=False,
+            )
+
+        models.append(type('Model{:03d}'.format(index), (db.Model,), attrs))
+
+    return tuple(models)
+
+
+def _record(table: int, row: int, paragraphs: int):
+    record = {
+        'slug': 'record-{}'.format(row),
+        'title': 'Record {} of table {}'.format(row, table),
+        'position': row,
+    }
+
+    if table > 0:
+        record['parent_slug'] = 'record-{}'.format(row)
+
+    content = '\n\n'.join(
+        'Paragraph {} of record {}. '.format(paragraph, row) * 8
+        for paragraph in range(paragraphs)
+    )
+
+    return record, content
+
+
+def _yaml_fields(record):
+    return ''.join(
+        '{}: {}\n'.format(key, value) for key, value in record.items()
+    )
+
+
+def generate_data_dir(path: Path, tables: int, files: int, paragraphs=3):
+    """
+    Write `tables` table directories with `files` records each below `path`
+    and return the number of files written.
+    """
+
+    written = 0
+
+    for index in range(tables):
+        directory = path.joinpath(table_name(index))
+        directory.mkdir(parents=True, exist_ok=True)
+
+        layout = layout_for(index)
+
+        if layout == 'all':
+            with directory.joinpath('_all.yml').open('w') as fd:
+                for row in range(files):
+                    record, content = _record(index, row, paragraphs)
+                    record['content'] = content.replace('\n', ' ')
+
+                    lines = _yaml_fields(record).splitlines()
+                    fd.write('- {}\n'.format(lines[0]))
+                    fd.writelines('  {}\n'.format(line) for line in lines[1:])
+
+            written += 1
+            continue
+
+        for row in range(files):
+            record, content = _record(index, row, paragraphs)
+
+            if layout == 'yaml':
+                record['content'] = content.replace('\n', ' ')
+
+                directory.joinpath('record-{}.yml'.format(row)).write_text(
+                    _yaml_fields(record)
+                )
+            else:
+                directory.joinpath('record-{}.md'.format(row)).write_text(
+                    '---\n{}---\n\n{}\n'.format(_yaml_fields(record), content)
+                )
+
+            written += 1
+
+    return written
@@ -0,0 +1,209 @@
+"""
+Benchmark how long loading a synthetic data directory takes.
+
+Usage:
+
+    python -m benchmarks.run --tables 12 --files 2000
+    python -m benchmarks.run --config FILEALCHEMY_BULK_INSERT=true
+
+Results are written to `benchmarks/results/<version>.json`. If results of
+other versions exist, the latest one is used as a baseline and the run fails
+if any phase got slower by more than `--threshold`.
+
+Timings are reported per phase, while `process_peak_rss` is the peak resident
+memory of the whole run, including generating the data directory.
+"""
+
+import argparse
+import json
+import resource
+import sys
+import tempfile
+import time
+from importlib.metadata import version
+from pathlib import Path
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+from flask_filealchemy import FileAlchemy
+from flask_filealchemy.loaders import loader_for
+
+from .generate import generate_data_dir, make_models
+
+RESULTS_DIR = Path(__file__).parent.joinpath('results')
+
+
+def _parse_value(value: str):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _make_app(data_dir: Path, tables: int, config):
+    app = Flask(__name__)
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db = SQLAlchemy()
+    db.init_app(app)
+
+    app.config['FILEALCHEMY_MODELS'] = make_models(db, tables)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.as_posix()
+    app.config.update(config)
+
+    return app, db
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _peak_rss():
+    # the peak of the whole process so far (there's no resetting it between
+    # phases), in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run(tables: int, files: int, config):
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        written = generate_data_dir(data_dir, tables, files)
+
+        app, db = _make_app(data_dir, tables, config)
+        sorted_tables = db.metadata.sorted_tables
+
+        models_by_table = {
+            model.__tablename__: model
+            for model in app.config['FILEALCHEMY_MODELS']
+        }
+        models = [models_by_table[table.name] for table in sorted_tables]
+        loaders = []
+
+        timings = {
+            'loader_for': _timed(
+                lambda: loaders.extend(
+                    loader_for(data_dir, table) for table in sorted_tables
+                )
+            ),
+            'extract_records': _timed(
+                lambda: [
+                    sum(1 for _ in loader.extract_records(model))
+                    for model, loader in zip(models, loaders)
+                ]
+            ),
+            'load_tables': _timed(FileAlchemy(app, db).load_tables),
+        }
+
+    return {
+        'version': version('flask-filealchemy'),
+        'tables': tables,
+        'files': written,
+        'records': tables * files,
+        'config': config,
+        'timings': timings,
+        'files_per_second': {
+            phase: written / seconds if seconds else None
+            for phase, seconds in timings.items()
+            if phase != 'loader_for'
+        },
+        'process_peak_rss': _peak_rss(),
+    }
+
+
+def compare(result, threshold: float):
+    """
+    Compare the result with the most recent stored result of a different
+    version and return a list of phases which regressed.
+    """
+
+    baselines = sorted(
+        (
+            path
+            for path in RESULTS_DIR.glob('*.json')
+            if path.stem != result['version']
+        ),
+        key=lambda path: path.stat().st_mtime,
+    )
+
+    if not baselines:
+        return []
+
+    baseline = json.loads(baselines[-1].read_text())
+
+    if (baseline['tables'], baseline['records'], baseline['config']) != (
+        result['tables'],
+        result['records'],
+        result['config'],
+    ):
+        print(
+            'skipping comparison, {} used other parameters'.format(
+                baselines[-1].name
+            )
+        )
+        return []
+
+    return [
+        '{}: {:.3f}s -> {:.3f}s ({})'.format(
+            phase, baseline['timings'][phase], seconds, baseline['version']
+        )
+        for phase, seconds in result['timings'].items()
+        if seconds > baseline['timings'].get(phase, seconds) * threshold
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tables', type=int, default=6)
+    parser.add_argument('--files', type=int, default=1000)
+    parser.add_argument(
+        '--config',
+        action='append',
+        default=[],
+        metavar='KEY=VALUE',
+        help='Flask config value, e.g. FILEALCHEMY_WORKERS=4',
+    )
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=1.2,
+        help='slowdown factor considered a regression',
+    )
+    parser.add_argument(
+        '--no-save', action='store_true', help='do not store the results'
+    )
+
+    args = parser.parse_args(argv)
+
+    config = {}
+
+    for item in args.config:
+        key, _, value = item.partition('=')
+        config[key] = _parse_value(value)
+
+    result = run(args.tables, args.files, config)
+
+    print(json.dumps(result, indent=2))
+
+    regressions = compare(result, args.threshold)
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        RESULTS_DIR.joinpath('{}.json'.format(result['version'])).write_text(
+            json.dumps(result, indent=2)
+        )
+
+    for regression in regressions:
+        print('regression: {}'.format(regression), file=sys.stderr)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+
+from .common import _fmt_log, LoadError
+
+MAGIC = b'FABUNDLE'
+VERSION = 1
+
+# magic, format version, SHA-256 checksum of the payload
+_HEADER = struct.Struct('>8sH32s')
+
+
+def write_bundle(path: str, fingerprint: str, tables):
+    """
+    Write a bundle to `path`.
+
+    `tables` maps table names to `(columns, data, file_keys)` tuples, where
+    `data` holds one list of values per column (in the order of `columns`)
+    and `file_keys` maps data directory paths to the primary keys read from
+    them.
+    """
+
+    payload = pickle.dumps(
+        {
+            'fingerprint': fingerprint,
+            'tables': {
+                name: {
+                    'columns': list(columns),
+                    'data': data,
+                    'file_keys': file_keys,
+                }
+                for name, (columns, data, file_keys) in tables.items()
+            },
+        },
+        protocol=pickle.HIGHEST_PROTOCOL,
+    )
+
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+
+    with open(tmp_path, 'wb') as fd:
+        fd.write(
+            _HEADER.pack(MAGIC, VERSION, hashlib.sha256(payload).digest())
+        )
+        fd.write(payload)
+
+    os.replace(tmp_path, path)
+
+
+def read_bundle(path: str):
+    """
+    Read the bundle at `path` (through a memory map) after checking its
+    header and checksum.
+    """
+
+    try:
+        with open(path, 'rb') as fd:
+            with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if len(mm) < _HEADER.size:
+                    raise ValueError()
+
+                magic, version, checksum = _HEADER.unpack_from(mm)
+
+                if magic != MAGIC or version != VERSION:
+                    raise ValueError()
+
+                with memoryview(mm) as view:
+                    payload = view[_HEADER.size :]
+
+                    try:
+                        if hashlib.sha256(payload).digest() != checksum:
+                            raise ValueError()
+
+                        return pickle.loads(payload)
+                    finally:
+                        payload.release()
+    except IOError:
+        raise LoadError(_fmt_log('could not open {}'.format(path)))
+    except (ValueError, pickle.UnpicklingError):
+        raise LoadError(_fmt_log('{} is not a valid bundle'.format(path)))
@@ -0,0 +1,227 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+
+class ParseCache:
+    """
+    ParseCache persists parsed file contents in a single SQLite database so
+    that unchanged files don't have to be parsed again on the next start.
+
+    Entries are keyed by the file path and the name of the parse function,
+    and are only used as long as the modification time and size of the file
+    stay the same. Once the total size of the stored entries goes above
+    `max_size` bytes, the least recently used entries are evicted.
+
+    New entries are written in batches of `batch_size`, each in its own short
+    transaction, so that several processes can share the same cache. Errors
+    (like the database being locked for longer than `timeout` seconds) are
+    treated as cache misses, and the entries involved aren't stored.
+
+    A ParseCache can be shared between threads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int = 256 * 1024 * 1024,
+        batch_size: int = 64,
+        timeout: float = 1.0,
+    ):
+        self.path = path
+        self.max_size = max_size
+        self.batch_size = batch_size
+
+        self.connection = sqlite3.connect(
+            path,
+            timeout=timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self.lock = threading.Lock()
+
+        try:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'path TEXT NOT NULL, '
+                'parser TEXT NOT NULL, '
+                'mtime_ns INTEGER NOT NULL, '
+                'size INTEGER NOT NULL, '
+                'data BLOB NOT NULL, '
+                'accessed REAL NOT NULL, '
+                'PRIMARY KEY (path, parser))'
+            )
+        except sqlite3.Error:
+            self.connection.close()
+            self.connection = None
+
+        # entries which haven't been written yet, keyed by (path, parser)
+        self._pending = {}
+        self._touched = []
+
+    def _lookup(self, parser: str, file_: str, columns: str):
+        row = self._pending.get((file_, parser))
+
+        if row is not None:
+            return row
+
+        if self.connection is None:
+            return None
+
+        try:
+            return self.connection.execute(
+                'SELECT {} FROM entries '
+                'WHERE path = ? AND parser = ?'.format(columns),
+                (file_, parser),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+
+    def contains(self, parser: str, file_: str, stat: os.stat_result):
+        with self.lock:
+            row = self._lookup(parser, file_, 'mtime_ns, size')
+
+        return row is not None and row[:2] == (
+            stat.st_mtime_ns,
+            stat.st_size,
+        )
+
+    def get(self, parser: str, file_: str, stat: os.stat_result):
+        """
+        Return a `(found, value)` tuple for the given file.
+        """
+
+        with self.lock:
+            row = self._lookup(parser, file_, 'mtime_ns, size, data')
+
+            if (
+                not row
+                or row[0] != stat.st_mtime_ns
+                or row[1] != stat.st_size
+            ):
+                return False, None
+
+            self._touched.append((time.time(), file_, parser))
+
+        try:
+            return True, pickle.loads(row[2])
+        except Exception:
+            return False, None
+
+    def set(self, parser: str, file_: str, stat: os.stat_result, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self.lock:
+            self._pending[(file_, parser)] = (
+                stat.st_mtime_ns,
+                stat.st_size,
+                data,
+            )
+
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+    def _write(self, statements):
+        """
+        Run the given `(sql, rows)` pairs in a single transaction. Return
+        whether that worked.
+        """
+
+        if self.connection is None:
+            return False
+
+        try:
+            self.connection.execute('BEGIN IMMEDIATE')
+
+            try:
+                for sql, rows in statements:
+                    self.connection.executemany(sql, rows)
+            except BaseException:
+                self.connection.execute('ROLLBACK')
+                raise
+
+            self.connection.execute('COMMIT')
+        except sqlite3.Error:
+            return False
+
+        return True
+
+    def _flush(self):
+        now = time.time()
+
+        rows = [
+            (path, parser, mtime_ns, size, data, now)
+            for (path, parser), (mtime_ns, size, data) in self._pending.items()
+        ]
+
+        # entries which couldn't be written are dropped either way
+        self._pending = {}
+
+        self._write(
+            [
+                (
+                    'INSERT OR REPLACE INTO entries '
+                    '(path, parser, mtime_ns, size, data, accessed) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    rows,
+                )
+            ]
+        )
+
+    def evict(self):
+        if self.connection is None:
+            return
+
+        try:
+            (total,) = self.connection.execute(
+                'SELECT COALESCE(SUM(LENGTH(data)), 0) FROM entries'
+            ).fetchone()
+
+            if total <= self.max_size:
+                return
+
+            cursor = self.connection.execute(
+                'SELECT path, parser, LENGTH(data) FROM entries '
+                'ORDER BY accessed ASC'
+            )
+
+            evicted = []
+
+            for path, parser, size in cursor:
+                if total <= self.max_size:
+                    break
+
+                evicted.append((path, parser))
+                total -= size
+        except sqlite3.Error:
+            return
+
+        self._write(
+            [('DELETE FROM entries WHERE path = ? AND parser = ?', evicted)]
+        )
+
+    def close(self):
+        with self.lock:
+            if self._pending:
+                self._flush()
+
+            if self._touched:
+                self._write(
+                    [
+                        (
+                            'UPDATE entries SET accessed = ? '
+                            'WHERE path = ? AND parser = ?',
+                            self._touched,
+                        )
+                    ]
+                )
+                self._touched = []
+
+            self.evict()
+
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
@@ -0,0 +1,159 @@
+from sqlalchemy.schema import Table
+
+from .common import _fmt_log, LoadError
+from .converters import converter_for
+
+
+def _names(columns):
+    return tuple(column.name for column in columns)
+
+
+def _normalizer(columns):
+    """
+    Return a function turning a tuple of values into the tuple of values the
+    database would compare for the given columns, so that e.g. `2020` and
+    `'2020'` are the same key of a string column. Values which can't be
+    converted are left for the database to complain about.
+    """
+
+    converters = tuple(converter_for(column.type) for column in columns)
+
+    def convert(converter, value):
+        if converter is None or value is None:
+            return value
+
+        try:
+            return converter(value)
+        except (TypeError, ValueError):
+            return value
+
+    def normalize(values):
+        return tuple(map(convert, converters, values))
+
+    return normalize
+
+
+def _fmt_key(key):
+    return repr(key[0]) if len(key) == 1 else repr(key)
+
+
+class IntegrityChecks:
+    """
+    IntegrityChecks finds duplicate primary keys and foreign keys referring
+    to missing rows while the rows of a complete load stream in, so that
+    problems are reported (naming the files causing them) before the rows
+    reach the database.
+
+    Tables have to be checked in dependency order (like `sorted_tables`).
+    Foreign keys referring to the same table, or to tables which haven't been
+    checked yet (cyclic dependencies), are left to the database. So are rows
+    without (complete) primary keys, which the database fills in, along with
+    foreign keys referring to their tables.
+    """
+
+    def __init__(self, tables):
+        # table name -> {primary key: file}
+        self.keys = {}
+
+        # names of tables with rows whose primary keys are left to the
+        # database (like autoincrement columns), and which therefore can't be
+        # referred to reliably
+        self.unkeyed = set()
+
+        # (table name, column names) -> set of values, for the columns
+        # (other than primary keys) which foreign keys refer to
+        self.values = {}
+
+        for table in tables:
+            for constraint in table.foreign_key_constraints:
+                referred = constraint.referred_table
+                names = _names(
+                    element.column for element in constraint.elements
+                )
+
+                if names != _names(referred.primary_key):
+                    self.values.setdefault((referred.name, names), set())
+
+    def table_checker(self, table: Table):
+        """
+        Return a function which checks (and indexes) a single row of the
+        given table, given the file it was read from.
+        """
+
+        key_names = _names(table.primary_key)
+        normalize_key = _normalizer(table.primary_key)
+        keys = self.keys.setdefault(table.name, {})
+
+        references = []
+
+        for constraint in table.foreign_key_constraints:
+            referred = constraint.referred_table
+
+            if referred is table or referred.name not in self.keys:
+                continue
+
+            if referred.name in self.unkeyed:
+                continue
+
+            names = _names(element.parent for element in constraint.elements)
+            referred_columns = [
+                element.column for element in constraint.elements
+            ]
+            referred_names = _names(referred_columns)
+
+            if referred_names == _names(referred.primary_key):
+                targets = self.keys[referred.name]
+            else:
+                targets = self.values[(referred.name, referred_names)]
+
+            # compare values as the types of the columns they refer to
+            references.append(
+                (
+                    names,
+                    _normalizer(referred_columns),
+                    referred.name,
+                    targets,
+                )
+            )
+
+        indexed = [
+            (names, _normalizer(table.columns[name] for name in names), values)
+            for (name, names), values in self.values.items()
+            if name == table.name
+        ]
+
+        def check(file_: str, row):
+            key = normalize_key(tuple(map(row.get, key_names)))
+
+            if None in key:
+                self.unkeyed.add(table.name)
+            elif key in keys:
+                raise LoadError(
+                    _fmt_log(
+                        '{}: duplicate {} {} (also in {})'.format(
+                            file_, table.name, _fmt_key(key), keys[key]
+                        )
+                    )
+                )
+            else:
+                keys[key] = file_
+
+            for names, normalize, referred_name, targets in references:
+                value = normalize(tuple(map(row.get, names)))
+
+                if value not in targets and None not in value:
+                    raise LoadError(
+                        _fmt_log(
+                            '{}: {} refers to missing {} {}'.format(
+                                file_,
+                                ', '.join(names),
+                                referred_name,
+                                _fmt_key(value),
+                            )
+                        )
+                    )
+
+            for names, normalize, values in indexed:
+                values.add(normalize(tuple(map(row.get, names))))
+
+        return check
@@ -0,0 +1,26 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+@click.group('filealchemy')
+def cli():
+    """Flask-FileAlchemy commands."""
+
+
+@cli.command('build')
+@click.option(
+    '--output',
+    '-o',
+    default=None,
+    help='Where to write the bundle (defaults to FILEALCHEMY_BUNDLE_PATH).',
+)
+@with_appcontext
+def build(output):
+    """Compile the data directory into a bundle."""
+
+    file_alchemy = current_app.extensions['filealchemy']
+
+    path = file_alchemy.build_bundle(output)
+
+    click.echo('wrote {}'.format(path))
@@ -1,7 +1,31 @@
-import codecs
+import json
+import os
+import re
+import threading
+from collections import deque
 from collections.abc import Mapping, Sequence
 
+import frontmatter
 from ruamel.yaml import YAML
+from ruamel.yaml.error import YAMLError
+from ruamel.yaml.events import (
+    SequenceEndEvent,
+    SequenceStartEvent,
+    StreamEndEvent,
+)
+
+try:
+    import yaml
+    from yaml import CSafeLoader
+except ImportError:
+    yaml = CSafeLoader = None
+
+_LIBYAML_ERRORS = (yaml.YAMLError,) if yaml is not None else ()
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 def _fmt_log(message):
@@ -12,12 +36,153 @@ class LoadError(Exception):
     pass
 
 
+_local = threading.local()
+
+
+def _load_ruamel(data: str):
+    parser = getattr(_local, 'ruamel', None)
+
+    if parser is None:
+        parser = _local.ruamel = YAML(typ='safe')
+
+    return parser.load(data)
+
+
+if CSafeLoader is not None:
+
+    class _CoreSchemaLoader(CSafeLoader):
+        """
+        libyaml based loader which resolves plain scalars the way ruamel.yaml
+        does, following the YAML 1.2 core schema instead of YAML 1.1 (so that
+        `yes` stays a string and `012` is the integer 12), and rejects
+        duplicate keys like ruamel.yaml does.
+        """
+
+        def construct_mapping(self, node, deep=False):
+            seen = set()
+
+            for key_node, _ in node.value:
+                # keys brought in by merges may be overridden
+                if key_node.tag == 'tag:yaml.org,2002:merge':
+                    continue
+
+                key = self.construct_object(key_node, deep=deep)
+
+                try:
+                    duplicate = key in seen
+                except TypeError:
+                    # unhashable keys are reported by the base class
+                    continue
+
+                if duplicate:
+                    raise yaml.constructor.ConstructorError(
+                        'while constructing a mapping',
+                        node.start_mark,
+                        'found duplicate key {!r}'.format(key),
+                        key_node.start_mark,
+                    )
+
+                seen.add(key)
+
+            return super().construct_mapping(node, deep=deep)
+
+        def construct_yaml_int(self, node):
+            value = self.construct_scalar(node).replace('_', '')
+
+            sign = -1 if value[0] == '-' else 1
+            value = value.lstrip('+-')
+
+            for prefix, base in (('0o', 8), ('0x', 16), ('0b', 2)):
+                if value.startswith(prefix):
+                    return sign * int(value[2:], base)
+
+            return sign * int(value)
+
+    _CoreSchemaLoader.yaml_implicit_resolvers = {
+        first: [
+            (tag, regexp)
+            for tag, regexp in resolvers
+            if tag
+            not in (
+                'tag:yaml.org,2002:bool',
+                'tag:yaml.org,2002:float',
+                'tag:yaml.org,2002:int',
+            )
+        ]
+        for first, resolvers in CSafeLoader.yaml_implicit_resolvers.items()
+    }
+
+    _CoreSchemaLoader.add_implicit_resolver(
+        'tag:yaml.org,2002:bool',
+        re.compile(r'^(?:true|True|TRUE|false|False|FALSE)$'),
+        list('tTfF'),
+    )
+    _CoreSchemaLoader.add_implicit_resolver(
+        'tag:yaml.org,2002:int',
+        re.compile(
+            r"""^(?:[-+]?0b[0-1_]+
+            |[-+]?0o?[0-7_]+
+            |[-+]?[0-9_]+
+            |[-+]?0x[0-9a-fA-F_]+)$""",
+            re.X,
+        ),
+        list('-+0123456789'),
+    )
+    _CoreSchemaLoader.add_implicit_resolver(
+        'tag:yaml.org,2002:float',
+        re.compile(
+            r"""^(?:[-+]?(?:[0-9][0-9_]*)\.[0-9_]*(?:[eE][-+]?[0-9]+)?
+            |[-+]?(?:[0-9][0-9_]*)(?:[eE][-+]?[0-9]+)
+            |[-+]?\.[0-9_]+(?:[eE][-+]?[0-9]+)?
+            |[-+]?\.(?:inf|Inf|INF)
+            |\.(?:nan|NaN|NAN))$""",
+            re.X,
+        ),
+        list('-+0123456789.'),
+    )
+    _CoreSchemaLoader.add_constructor(
+        'tag:yaml.org,2002:int', _CoreSchemaLoader.construct_yaml_int
+    )
+
+    def _load_libyaml(data: str):
+        return yaml.load(data, Loader=_CoreSchemaLoader)
+
+else:
+    _load_libyaml = None
+
+
+YAML_BACKENDS = {'ruamel': _load_ruamel}
+
+if _load_libyaml is not None:
+    YAML_BACKENDS['libyaml'] = _load_libyaml
+
+_yaml_backend = _load_libyaml or _load_ruamel
+
+
+def set_yaml_backend(name: str = 'auto'):
+    """
+    Select the YAML parser used by `parse_yaml_file`.
+
+    `libyaml` uses PyYAML's C extension (if available) and `ruamel` the
+    ruamel.yaml parser. `auto` picks the former if it's available.
+    """
+
+    global _yaml_backend
+
+    if name == 'auto':
+        _yaml_backend = _load_libyaml or _load_ruamel
+    elif name in YAML_BACKENDS:
+        _yaml_backend = YAML_BACKENDS[name]
+    else:
+        raise LoadError(_fmt_log('unknown YAML backend {}'.format(name)))
+
+
 def parse_yaml_file(file_: str):
     try:
-        with codecs.open(file_) as fd:
+        with open(file_) as fd:
             data = fd.read()
 
-        values = YAML(typ='safe').load(data)
+        values = _yaml_backend(data)
 
         if isinstance(values, Sequence):
             for value in values:
@@ -27,7 +192,228 @@ def parse_yaml_file(file_: str):
             raise ValueError()
     except IOError:
         raise LoadError(_fmt_log('could not open {}'.format(file_)))
-    except ValueError:
+    except (ValueError, YAMLError) + _LIBYAML_ERRORS:
         raise LoadError(_fmt_log('{} contains invalid YAML'.format(file_)))
     else:
         return values
+
+
+def iter_yaml_file(file_: str):
+    """
+    Yield the mappings stored in a YAML file one at a time, without reading
+    the whole file into memory.
+
+    The file can either contain a sequence of mappings (like `_all.yml`), or
+    multiple documents separated by `---`, each of which contains a mapping
+    or a sequence of mappings.
+    """
+
+    def construct(node):
+        value = constructor.construct_document(node)
+
+        if not isinstance(value, Mapping):
+            raise ValueError()
+
+        return value
+
+    try:
+        with open(file_) as fd:
+            yaml_ = YAML(typ='safe', pure=True)
+
+            constructor, parser = yaml_.get_constructor_parser(fd)
+            composer = yaml_.composer
+
+            parser.get_event()
+
+            while not parser.check_event(StreamEndEvent):
+                parser.get_event()
+
+                if parser.check_event(SequenceStartEvent):
+                    parser.get_event()
+
+                    while not parser.check_event(SequenceEndEvent):
+                        yield construct(composer.compose_node(None, None))
+
+                    parser.get_event()
+                else:
+                    yield construct(composer.compose_node(None, None))
+
+                parser.get_event()
+    except IOError:
+        raise LoadError(_fmt_log('could not open {}'.format(file_)))
+    except (ValueError, YAMLError):
+        raise LoadError(_fmt_log('{} contains invalid YAML'.format(file_)))
+
+
+_load_json = orjson.loads if orjson is not None else json.loads
+
+
+def parse_json_file(file_: str):
+    """
+    Parse a JSON file containing a single object, using `orjson` if it's
+    available.
+    """
+
+    try:
+        with open(file_, 'rb') as fd:
+            values = _load_json(fd.read())
+
+        if not isinstance(values, Mapping):
+            raise ValueError()
+    except IOError:
+        raise LoadError(_fmt_log('could not open {}'.format(file_)))
+    except ValueError:
+        raise LoadError(_fmt_log('{} contains invalid JSON'.format(file_)))
+    else:
+        return values
+
+
+def iter_json_lines_file(file_: str):
+    """
+    Yield the objects stored in a JSON lines file (one object per line) one
+    at a time. Blank lines are skipped.
+    """
+
+    line_number = 0
+
+    try:
+        with open(file_, 'rb') as fd:
+            for line_number, line in enumerate(fd, 1):
+                if not line.strip():
+                    continue
+
+                value = _load_json(line)
+
+                if not isinstance(value, Mapping):
+                    raise ValueError()
+
+                yield value
+    except IOError:
+        raise LoadError(_fmt_log('could not open {}'.format(file_)))
+    except ValueError:
+        raise LoadError(
+            _fmt_log(
+                '{} contains invalid JSON on line {}'.format(
+                    file_, line_number
+                )
+            )
+        )
+
+
+def parse_frontmatter_file(file_: str):
+    post = frontmatter.load(file_)
+
+    return post.metadata, post.content
+
+
+def _parse_chunk(parse_fn, files):
+    return [parse_fn(file_) for file_ in files]
+
+
+class FileParser:
+    """
+    FileParser applies a parse function to a list of files, either one after
+    the other in the current process or spread over the given executor.
+
+    Results are always returned in the order of the input files. If a cache
+    is given, files which haven't changed since they were last parsed are
+    served from the cache and never reach the parse function.
+
+    Files of at least `stream_size` bytes should be streamed instead of being
+    parsed in one go.
+
+    At most `max_pending` chunks (of `chunksize` files each) are handed to
+    the executor ahead of the results being consumed, so that fast workers
+    can't pile up parsed files in memory.
+    """
+
+    def __init__(
+        self,
+        executor=None,
+        cache=None,
+        chunksize: int = 16,
+        stream_size: int = None,
+        max_pending: int = 64,
+    ):
+        self.executor = executor
+        self.cache = cache
+        self.chunksize = chunksize
+        self.stream_size = stream_size
+        self.max_pending = max_pending
+
+    def should_stream(self, file_: str):
+        if self.stream_size is None:
+            return False
+
+        try:
+            return os.path.getsize(file_) >= self.stream_size
+        except OSError:
+            return False
+
+    def parse(self, parse_fn, files):
+        if self.cache is None:
+            return self._map(parse_fn, files)
+
+        return self._parse_cached(parse_fn, files)
+
+    def parse_one(self, parse_fn, file_: str):
+        return next(iter(self.parse(parse_fn, [file_])))
+
+    def _map(self, parse_fn, files):
+        if self.executor is None:
+            return map(parse_fn, files)
+
+        return self._map_executor(parse_fn, list(files))
+
+    def _map_executor(self, parse_fn, files):
+        pending = deque()
+
+        for offset in range(0, len(files), self.chunksize):
+            pending.append(
+                self.executor.submit(
+                    _parse_chunk,
+                    parse_fn,
+                    files[offset : offset + self.chunksize],
+                )
+            )
+
+            if len(pending) >= self.max_pending:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+    def _parse_cached(self, parse_fn, files):
+        key = parse_fn.__qualname__
+
+        stats = {}
+        hits = set()
+
+        for file_ in files:
+            try:
+                stats[file_] = os.stat(file_)
+            except OSError:
+                # leave it to the parse function to report the error
+                continue
+
+            if self.cache.contains(key, file_, stats[file_]):
+                hits.add(file_)
+
+        parsed = self._map(
+            parse_fn, [file_ for file_ in files if file_ not in hits]
+        )
+
+        for file_ in files:
+            if file_ in hits:
+                # cached values are only read once they're needed
+                found, value = self.cache.get(key, file_, stats[file_])
+
+                yield value if found else parse_fn(file_)
+                continue
+
+            value = next(parsed)
+
+            if file_ in stats:
+                self.cache.set(key, file_, stats[file_], value)
+
+            yield value
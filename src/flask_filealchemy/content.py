@@ -0,0 +1,154 @@
+import mmap
+import os
+from functools import lru_cache
+from typing import NamedTuple
+
+import frontmatter
+from flask import current_app, has_app_context
+from sqlalchemy.types import String, TypeDecorator
+
+from .common import _fmt_log, LoadError
+
+# number of content bodies kept around after being read from disk
+CONTENT_CACHE_SIZE = 128
+
+
+class ContentReference(NamedTuple):
+    """
+    ContentReference points to the body of a Markdown file: `length` bytes
+    starting at `offset`, as of the time the file was last modified at
+    `mtime_ns`. Stored references use paths relative to the data directory,
+    so that they stay valid when the data directory is moved.
+    """
+
+    path: str
+    offset: int
+    length: int
+    mtime_ns: int
+
+    def dumps(self):
+        return '{}:{}:{}:{}'.format(
+            self.offset, self.length, self.mtime_ns, self.path
+        )
+
+    @classmethod
+    def loads(cls, value: str):
+        offset, length, mtime_ns, path = value.split(':', 3)
+
+        return cls(path, int(offset), int(length), int(mtime_ns))
+
+
+def parse_frontmatter_reference(file_: str):
+    """
+    Parse the front matter of `file_`, returning a `ContentReference` to the
+    body instead of the body itself.
+    """
+
+    try:
+        with open(file_, 'rb') as fd:
+            raw = fd.read()
+            mtime_ns = os.fstat(fd.fileno()).st_mtime_ns
+    except IOError:
+        raise LoadError(_fmt_log('could not open {}'.format(file_)))
+
+    text = raw.decode('utf-8')
+    metadata, content = frontmatter.parse(text)
+
+    # the body is stripped, so it's the last occurrence of itself in the file
+    index = text.rfind(content)
+
+    return metadata, ContentReference(
+        file_,
+        len(text[:index].encode('utf-8')),
+        len(content.encode('utf-8')),
+        mtime_ns,
+    )
+
+
+class _StaleReference(Exception):
+    pass
+
+
+@lru_cache(maxsize=CONTENT_CACHE_SIZE)
+def _read_content(path: str, offset: int, length: int, mtime_ns: int):
+    with open(path, 'rb') as fd:
+        if os.fstat(fd.fileno()).st_mtime_ns != mtime_ns:
+            raise _StaleReference()
+
+        if not length:
+            return ''
+
+        with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return buffer[offset : offset + length].decode('utf-8')
+
+
+def read_content(reference: ContentReference, data_dir=None):
+    """
+    Read the body `reference` points to, resolving relative paths against
+    `data_dir`. Recently read bodies are cached.
+
+    If the file was modified since the reference was taken (and the database
+    hasn't been synced yet), the body is looked up in the file again instead
+    of trusting the stored offset.
+    """
+
+    if data_dir is not None:
+        reference = reference._replace(
+            path=os.path.join(data_dir, reference.path)
+        )
+
+    try:
+        if os.stat(reference.path).st_mtime_ns == reference.mtime_ns:
+            try:
+                return _read_content(*reference)
+            except _StaleReference:
+                pass
+
+        _, reference = parse_frontmatter_reference(reference.path)
+
+        return _read_content(*reference)
+    except LoadError:
+        raise
+    except Exception:
+        raise LoadError(
+            _fmt_log('could not read content from {}'.format(reference.path))
+        )
+
+
+class DeferredText(TypeDecorator):
+    """
+    DeferredText is a column type for Markdown bodies which stores a reference
+    to the file the body was read from, instead of the body itself. The body
+    is read from the file whenever the column is loaded, so it's best combined
+    with `sqlalchemy.orm.deferred` to only do that when it's accessed. Files
+    are looked up in the data directory of the current app.
+    """
+
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+
+        if not isinstance(value, ContentReference):
+            raise TypeError(
+                'DeferredText columns only accept content references'
+            )
+
+        return value.dumps()
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+
+        return read_content(ContentReference.loads(value), _data_dir())
+
+
+def _data_dir():
+    if not has_app_context():
+        return None
+
+    file_alchemy = current_app.extensions.get('filealchemy')
+
+    return None if file_alchemy is None else file_alchemy.data_dir
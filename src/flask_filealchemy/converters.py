@@ -0,0 +1,223 @@
+import datetime
+import decimal
+from collections.abc import Mapping, Sequence, Set
+
+from sqlalchemy import types
+from sqlalchemy.schema import Table
+
+from .common import _fmt_log, LoadError
+
+_TRUE = frozenset(('1', 'true', 't', 'yes', 'y', 'on'))
+_FALSE = frozenset(('0', 'false', 'f', 'no', 'n', 'off'))
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+
+    if isinstance(value, int):
+        return bool(value)
+
+    lowered = str(value).strip().lower()
+
+    if lowered in _TRUE:
+        return True
+
+    if lowered in _FALSE:
+        return False
+
+    raise ValueError('{!r} is not a boolean'.format(value))
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        raise ValueError('{!r} is not an integer'.format(value))
+
+    if isinstance(value, int):
+        return value
+
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError('{!r} is not an integer'.format(value))
+
+        return int(value)
+
+    return int(value)
+
+
+def _to_float(value):
+    if isinstance(value, bool):
+        raise ValueError('{!r} is not a number'.format(value))
+
+    return float(value)
+
+
+def _to_decimal(value):
+    if isinstance(value, bool):
+        raise ValueError('{!r} is not a number'.format(value))
+
+    if isinstance(value, float):
+        value = repr(value)
+
+    try:
+        return decimal.Decimal(value)
+    except decimal.InvalidOperation:
+        raise ValueError('{!r} is not a number'.format(value))
+
+
+def _to_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+
+    if isinstance(value, datetime.date):
+        return value
+
+    return datetime.date.fromisoformat(value)
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+
+    return datetime.datetime.fromisoformat(value)
+
+
+def _to_time(value):
+    if isinstance(value, datetime.time):
+        return value
+
+    return datetime.time.fromisoformat(value)
+
+
+def _to_str(value):
+    if isinstance(value, str):
+        return value
+
+    if isinstance(value, (Mapping, Sequence, Set)):
+        raise ValueError('{!r} is not a string'.format(value))
+
+    return str(value)
+
+
+# checked in order, so subclasses need to come before their base classes
+_CONVERTERS = (
+    (types.Boolean, _to_bool),
+    (types.Integer, _to_int),
+    (types.Float, _to_float),
+    (types.Numeric, _to_decimal),
+    (types.DateTime, _to_datetime),
+    (types.Date, _to_date),
+    (types.Time, _to_time),
+    (types.String, _to_str),
+)
+
+
+def converter_for(type_):
+    """
+    Return a function converting (text or already parsed) values to the
+    Python type the given column type expects, or `None` if values for that
+    column type are passed on as they are.
+
+    Converters raise `ValueError` (or `TypeError`) for values they can't
+    convert. `None` is never passed to them.
+    """
+
+    if isinstance(type_, types.TypeDecorator):
+        # custom types take care of their own values
+        return None
+
+    for base, converter in _CONVERTERS:
+        if isinstance(type_, base):
+            return converter
+
+    return None
+
+
+def convert_column(converter, values):
+    """
+    Convert a column of values at once, turning empty strings into `None`.
+    Return the list of converted values.
+    """
+
+    if converter is None:
+        return [None if value == '' else value for value in values]
+
+    return [
+        None if value is None or value == '' else converter(value)
+        for value in values
+    ]
+
+
+class RowConverter:
+    """
+    RowConverter converts the values of rows read from the data directory to
+    the types of their columns, and makes sure that required columns (which
+    aren't nullable and have no default) have values.
+
+    Everything that can be worked out from the table (which columns to check,
+    and how to convert them) is done once when the converter is created.
+    Errors are raised as `LoadError`s naming the file the row was read from.
+    """
+
+    def __init__(self, table: Table):
+        self.columns = tuple(
+            (
+                column.name,
+                converter_for(column.type),
+                not column.nullable
+                and column.default is None
+                and column.server_default is None
+                and column is not table.autoincrement_column,
+            )
+            for column in table.columns
+        )
+
+    def __call__(self, file_: str, row):
+        for name, converter, required in self.columns:
+            value = row.get(name)
+
+            if value is None:
+                if required:
+                    raise LoadError(
+                        _fmt_log('{}: missing {}'.format(file_, name))
+                    )
+
+                continue
+
+            if converter is not None:
+                try:
+                    row[name] = converter(value)
+                except (TypeError, ValueError) as e:
+                    raise LoadError(
+                        _fmt_log('{}: invalid {} ({})'.format(file_, name, e))
+                    )
+
+        return row
+
+    def convert_batch(self, file_: str, data):
+        """
+        Convert a batch of columns (as extracted by columnar loaders) in
+        place, one column at a time.
+        """
+
+        for name, converter, required in self.columns:
+            values = data[name]
+
+            if required and None in values:
+                raise LoadError(_fmt_log('{}: missing {}'.format(file_, name)))
+
+            if converter is not None:
+                try:
+                    data[name] = [
+                        None if value is None else converter(value)
+                        for value in values
+                    ]
+                except (TypeError, ValueError) as e:
+                    raise LoadError(
+                        _fmt_log('{}: invalid {} ({})'.format(file_, name, e))
+                    )
+
+        return data
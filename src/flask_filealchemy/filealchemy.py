@@ -1,11 +1,36 @@
+import asyncio
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
+from time import perf_counter
 
+from sqlalchemy import create_engine, delete, event, tuple_
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 from sqlalchemy.schema import Table
 
-from .common import _fmt_log, LoadError
+from .bundle import read_bundle, write_bundle
+from .cache import ParseCache
+from .checks import IntegrityChecks
+from .cli import cli
+from .common import _fmt_log, FileParser, LoadError, set_yaml_backend
+from .converters import RowConverter
 from .loaders import loader_for
+from .manifest import content_fingerprint, fingerprint, scan_data_dir
+from .query_cache import QueryCache
+from .shared import file_lock
+from .signals import table_loaded, tables_loaded
+from .snapshot import restore_snapshot, save_snapshot, snapshot_state
+from .stats import LoadStats, TableStats
+from .watcher import Watcher
 
 
 class FileAlchemy:
@@ -16,8 +41,74 @@ class FileAlchemy:
         self.data_dir = Path(self.app.config.get('FILEALCHEMY_DATA_DIR'))
         self.models = self.app.config.get('FILEALCHEMY_MODELS')
 
+        self.bulk_insert = self.app.config.get(
+            'FILEALCHEMY_BULK_INSERT', False
+        )
+        self.batch_size = self.app.config.get('FILEALCHEMY_BATCH_SIZE', 1000)
+        self.workers = self.app.config.get('FILEALCHEMY_WORKERS')
+        self.cache_path = self.app.config.get('FILEALCHEMY_CACHE_PATH')
+        self.cache_max_size = self.app.config.get(
+            'FILEALCHEMY_CACHE_MAX_SIZE', 256 * 1024 * 1024
+        )
+        self.snapshot_path = self.app.config.get('FILEALCHEMY_SNAPSHOT_PATH')
+        self.low_memory = self.app.config.get('FILEALCHEMY_LOW_MEMORY', False)
+        self.stream_size = self.app.config.get(
+            'FILEALCHEMY_STREAM_SIZE', 0 if self.low_memory else None
+        )
+        self.yaml_backend = self.app.config.get(
+            'FILEALCHEMY_YAML_BACKEND', 'auto'
+        )
+        self.lazy = self.app.config.get('FILEALCHEMY_LAZY', False)
+        self.table_workers = self.app.config.get('FILEALCHEMY_TABLE_WORKERS')
+        self.log_summary = self.app.config.get(
+            'FILEALCHEMY_LOG_SUMMARY', False
+        )
+        self.bundle_path = self.app.config.get('FILEALCHEMY_BUNDLE_PATH')
+        self.bundle_verify = self.app.config.get(
+            'FILEALCHEMY_BUNDLE_VERIFY', True
+        )
+        self.query_cache_size = self.app.config.get(
+            'FILEALCHEMY_QUERY_CACHE_SIZE'
+        )
+        self.shared_path = self.app.config.get('FILEALCHEMY_SHARED_PATH')
+        self.validate_rows = self.app.config.get('FILEALCHEMY_VALIDATE', False)
+        self.check_integrity = self.app.config.get(
+            'FILEALCHEMY_CHECK_INTEGRITY', False
+        )
+
+        # state of the data directory as of the last load or sync, mapping
+        # `<table>/<file>` paths to their `(mtime_ns, size)` and to the
+        # primary keys of the rows read from them
+        self.manifest = {}
+        self.file_keys = {}
+
+        # timings of the last `load_tables` call
+        self.stats = None
+
+        # names of the tables which (in lazy mode) haven't been loaded yet
+        self.pending = set()
+        self._pending_lock = threading.RLock()
+        self._engine = None
+
+        # primary and foreign key checks of the load in progress, if enabled
+        self.checks = None
+
+        # results of queries against the loaded tables, if enabled
+        self.query_cache = None
+
+        if self.query_cache_size:
+            self.query_cache = QueryCache(self.query_cache_size)
+
         self.validate()
 
+        self.models_by_table = {
+            model.__tablename__: model for model in self.models
+        }
+        self.row_converters = {}
+
+        self.app.extensions['filealchemy'] = self
+        self.app.cli.add_command(cli)
+
     def validate(self):
         if not self.models:
             raise LoadError(_fmt_log('no models found'))
@@ -28,39 +119,917 @@ class FileAlchemy:
             )
 
     def load_tables(self):
+        if self.shared_path:
+            return self.attach_shared()
+
         with self.app.app_context():
+            manifest = scan_data_dir(self.data_dir)
+
+            if self.snapshot_path:
+                snapshot_fingerprint = fingerprint(manifest, self.db.metadata)
+
+                state = restore_snapshot(
+                    self.db.engine, self.snapshot_path, snapshot_fingerprint
+                )
+
+                if state is not None:
+                    self.manifest = manifest
+                    self.file_keys = state.get('file_keys', {})
+                    self.data_changed()
+                    return
+
             self.db.create_all()
 
-            with self.make_session() as session:
+            self.manifest = manifest
+
+            if self.lazy:
+                self.file_keys = {}
+                self.pending = {
+                    table.name for table in self.db.metadata.sorted_tables
+                }
+                self._engine = self.db.engine
+                self.data_changed()
+
+                return
+
+            file_keys = {}
+            stats = LoadStats()
+
+            bundle = self.fresh_bundle()
+
+            with self.make_parser() as parser:
+                with self.make_session(stats) as session:
+                    if bundle is not None:
+                        self.load_bundle(session, bundle, file_keys)
+                    else:
+                        self.load_all(session, parser, file_keys, stats)
+
+            self.file_keys = file_keys
+            self.stats = stats
+            self.data_changed()
+
+            tables_loaded.send(self.app, stats=stats)
+
+            if self.log_summary:
+                self.app.logger.info(_fmt_log(stats.summary()))
+
+            if self.snapshot_path:
+                save_snapshot(
+                    self.db.engine,
+                    self.snapshot_path,
+                    snapshot_fingerprint,
+                    {'file_keys': file_keys},
+                )
+
+    def build_shared(self):
+        """
+        Load all tables into the shared database at `FILEALCHEMY_SHARED_PATH`
+        unless it was already built from the current data directory, and
+        return the state saved along with it.
+
+        Only one process builds the database at a time (the others wait for
+        it to finish), so this can be called from every worker, or once from
+        a pre-fork hook in the master process.
+        """
+
+        if not self.shared_path:
+            raise LoadError(_fmt_log('no shared database path configured'))
+
+        with self.app.app_context(), file_lock(self.shared_path + '.lock'):
+            manifest = scan_data_dir(self.data_dir)
+            shared_fingerprint = fingerprint(manifest, self.db.metadata)
+
+            self.manifest = manifest
+
+            state = snapshot_state(self.shared_path, shared_fingerprint)
+
+            if state is not None:
+                return state
+
+            # load into a private in-memory database which is then copied
+            # over, since the app's own engine is attached read-only
+            engine = create_engine('sqlite://')
+
+            try:
+                self.db.metadata.create_all(engine)
+
+                file_keys = {}
+                stats = LoadStats()
+
+                bundle = self.fresh_bundle()
+
+                with self.make_parser() as parser:
+                    with Session(engine) as session, session.begin():
+                        if bundle is not None:
+                            self.load_bundle(session, bundle, file_keys)
+                        else:
+                            self.load_all(session, parser, file_keys, stats)
+
+                state = {'file_keys': file_keys}
+
+                save_snapshot(
+                    engine, self.shared_path, shared_fingerprint, state
+                )
+            finally:
+                engine.dispose()
+
+            self.stats = stats
+
+            tables_loaded.send(self.app, stats=stats)
+
+            if self.log_summary:
+                self.app.logger.info(_fmt_log(stats.summary()))
+
+            return state
+
+    def attach_shared(self):
+        """
+        Make sure the shared database is built, and pick up the state saved
+        along with it. The app's database URI is expected to point to the
+        shared database (see `shared.shared_database_uri`).
+        """
+
+        state = self.build_shared()
+
+        self.file_keys = state.get('file_keys', {})
+        self.data_changed()
+
+    def after_fork(self):
+        """
+        Drop the database connections inherited from the parent process
+        (without closing them, since the parent still owns them). Meant to be
+        called from a post-fork hook in each worker process.
+        """
+
+        with self.app.app_context():
+            for engine in self.db.engines.values():
+                engine.dispose(close=False)
+
+    def build_bundle(self, path: str = None):
+        """
+        Run every loader once and write the extracted records to a bundle
+        file (column by column), which `load_tables` then loads instead of
+        the data directory as long as the data directory doesn't change.
+        Return the path of the bundle.
+        """
+
+        path = path or self.bundle_path
+
+        if not path:
+            raise LoadError(_fmt_log('no bundle path configured'))
+
+        with self.app.app_context():
+            self.manifest = scan_data_dir(self.data_dir)
+
+            tables = {}
+
+            with self.make_parser() as parser, self.make_checks():
                 for table in self.db.metadata.sorted_tables:
-                    model = self.model_for(table)
+                    _, loader = self.resolve(table)
 
-                    if not model:
-                        raise LoadError(
-                            _fmt_log(
-                                'no model found for {}'.format(table.name)
-                            )
+                    file_keys = {}
+                    columns = [column.name for column in table.columns]
+
+                    rows = list(
+                        self.track_keys(
+                            table, loader.extract_entries(parser), file_keys
                         )
+                    )
+
+                    tables[table.name] = (
+                        columns,
+                        [[row.get(name) for row in rows] for name in columns],
+                        file_keys,
+                    )
+
+            write_bundle(
+                path,
+                content_fingerprint(self.data_dir, self.db.metadata),
+                tables,
+            )
+
+        return path
+
+    def fresh_bundle(self):
+        """
+        Return the contents of the configured bundle if there is one and it
+        was built from the current data directory, and `None` otherwise.
+        """
+
+        if not self.bundle_path or not Path(self.bundle_path).is_file():
+            return None
+
+        bundle = read_bundle(self.bundle_path)
+
+        if not self.bundle_verify:
+            return bundle
+
+        current = content_fingerprint(self.data_dir, self.db.metadata)
+
+        return bundle if bundle['fingerprint'] == current else None
+
+    def load_bundle(self, session, bundle, file_keys=None):
+        for table in self.db.metadata.sorted_tables:
+            data = bundle['tables'].get(table.name)
+
+            if data is None:
+                raise LoadError(
+                    _fmt_log('no bundled data for {}'.format(table.name))
+                )
+
+            columns = data['columns']
+            rows = (
+                dict(zip(columns, values)) for values in zip(*data['data'])
+            )
+
+            try:
+                self.insert_rows(session, table, rows)
+                session.flush()
+            except IntegrityError as e:
+                raise LoadError(e)
+
+            if file_keys is not None:
+                file_keys.update(data['file_keys'])
+
+    def load_all(
+        self,
+        session,
+        parser: FileParser = None,
+        file_keys=None,
+        load_stats: LoadStats = None,
+    ):
+        # extracting tables concurrently needs to hold all their rows in
+        # memory at once
+        concurrent = (self.table_workers or 0) > 1 and not self.low_memory
+
+        with self.make_checks():
+            if concurrent:
+                self.load_tables_concurrently(
+                    session, parser, file_keys, load_stats
+                )
+            else:
+                for table in self.db.metadata.sorted_tables:
+                    self.load_table(
+                        session, table, parser, file_keys, load_stats
+                    )
+
+    def load_table(
+        self,
+        session,
+        table: Table,
+        parser: FileParser = None,
+        file_keys=None,
+        load_stats: LoadStats = None,
+    ):
+        stats = TableStats(table.name)
+
+        with stats.phase('scan'):
+            model, loader = self.resolve(table)
+
+        if loader.columnar:
+            batches = stats.timed(
+                'parse',
+                loader.extract_batches(parser, batch_size=self.batch_size),
+            )
+
+            self.write_batches(session, table, batches, file_keys, stats)
+        else:
+            entries = stats.timed('parse', loader.extract_entries(parser))
+
+            self.write_table(session, table, model, entries, file_keys, stats)
+
+        if load_stats is not None:
+            load_stats.tables.append(stats)
+
+    def load_tables_concurrently(
+        self,
+        session,
+        parser: FileParser = None,
+        file_keys=None,
+        load_stats: LoadStats = None,
+    ):
+        """
+        Extract the records of all tables in a pool of
+        `FILEALCHEMY_TABLE_WORKERS` threads, and write each table as soon as
+        it has been extracted and the tables it references have been written.
+        """
+
+        tables = self.db.metadata.sorted_tables
+
+        dependencies = {
+            table: {
+                constraint.referred_table
+                for constraint in table.foreign_key_constraints
+                if constraint.referred_table is not table
+                and constraint.referred_table in tables
+            }
+            for table in tables
+        }
+
+        executor = ThreadPoolExecutor(max_workers=self.table_workers)
+
+        try:
+            futures = {
+                table: executor.submit(self.extract_table, table, parser)
+                for table in tables
+            }
+
+            remaining = list(tables)
+
+            while remaining:
+                ready = [
+                    table
+                    for table in remaining
+                    if futures[table].done()
+                    and not dependencies[table] & set(remaining)
+                ]
+
+                if not ready:
+                    running = [
+                        futures[table]
+                        for table in remaining
+                        if not futures[table].done()
+                    ]
+
+                    if running:
+                        wait(running, return_when=FIRST_COMPLETED)
+                        continue
+
+                    # only cyclic dependencies left, fall back to the order
+                    # of `sorted_tables`
+                    ready = remaining[:1]
+
+                for table in ready:
+                    model, entries, stats = futures[table].result()
+
+                    self.write_table(
+                        session, table, model, entries, file_keys, stats
+                    )
+                    remaining.remove(table)
+
+                    if load_stats is not None:
+                        load_stats.tables.append(stats)
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def extract_table(self, table: Table, parser: FileParser = None):
+        """
+        Return the model, the list of `(file, row)` entries, and the stats
+        for the given table.
+        """
+
+        stats = TableStats(table.name)
+
+        with stats.phase('scan'):
+            model, loader = self.resolve(table)
+
+        with stats.phase('parse'):
+            entries = list(loader.extract_entries(parser))
+
+        return model, entries, stats
+
+    def write_table(
+        self,
+        session,
+        table: Table,
+        model,
+        entries,
+        file_keys,
+        stats: TableStats = None,
+    ):
+        stats = stats or TableStats(table.name)
+
+        rows = self.track_keys(
+            table, entries, {} if file_keys is None else file_keys, stats
+        )
+
+        try:
+            if self.bulk_insert:
+                self.insert_rows(session, table, rows, stats)
+            else:
+                construct = 0.0
+
+                for index, row in enumerate(rows, 1):
+                    start = perf_counter()
+                    session.add(model(**row))
+                    construct += perf_counter() - start
+
+                    if self.low_memory and index % self.batch_size == 0:
+                        # write the batch and drop the instances from the
+                        # identity map instead of holding on to all of them
+                        with stats.phase('flush'):
+                            session.flush()
+
+                        session.expunge_all()
+
+                stats.timings['construct'] += construct
+
+            with stats.phase('flush'):
+                session.flush()
+        except IntegrityError as e:
+            raise LoadError(e)
+
+        table_loaded.send(self.app, stats=stats)
+
+    def write_batches(
+        self,
+        session,
+        table: Table,
+        batches,
+        file_keys,
+        stats: TableStats = None,
+    ):
+        """
+        Insert the `(file, data)` batches extracted by a columnar loader
+        using Core `INSERT` statements, recording the primary keys read from
+        each file in `file_keys`.
+        """
+
+        stats = stats or TableStats(table.name)
+        file_keys = {} if file_keys is None else file_keys
+
+        last_file, keys = None, None
+        key_names = tuple(column.name for column in table.primary_key)
+        convert = self.row_converter(table) if self.validate_rows else None
+        check = self.checks and self.checks.table_checker(table)
+
+        try:
+            for file_, data in batches:
+                if convert is not None:
+                    data = convert.convert_batch(file_, data)
+
+                if file_ != last_file:
+                    path = Path(file_).relative_to(self.data_dir).as_posix()
+                    keys = file_keys.setdefault(path, [])
+                    last_file = file_
 
-                    loader = loader_for(self.data_dir, table)
+                    stats.files += 1
+                    stats.bytes += self.manifest.get(path, (0, 0))[1]
 
-                    if not loader:
-                        raise LoadError(
-                            _fmt_log(
-                                'no loader found for {}'.format(table.name)
+                keys.extend(zip(*(data[name] for name in key_names)))
+
+                with stats.phase('construct'):
+                    names = list(data)
+                    rows = [
+                        dict(zip(names, values))
+                        for values in zip(*data.values())
+                    ]
+
+                if check is not None:
+                    for row in rows:
+                        check(file_, row)
+
+                stats.records += len(rows)
+
+                self.insert_rows(session, table, rows, stats)
+
+            with stats.phase('flush'):
+                session.flush()
+        except IntegrityError as e:
+            raise LoadError(e)
+
+        table_loaded.send(self.app, stats=stats)
+
+    async def async_load_tables(self, engine):
+        """
+        Load all tables into the database behind the given `AsyncEngine`
+        without blocking the event loop.
+
+        The files of each table are read and parsed in the event loop's
+        default executor (all tables are started right away), while the rows
+        of the tables parsed so far are inserted in batches.
+        """
+
+        loop = asyncio.get_running_loop()
+        tables = self.db.metadata.sorted_tables
+
+        self.manifest = await loop.run_in_executor(
+            None, scan_data_dir, self.data_dir
+        )
+
+        file_keys = {}
+        stats = LoadStats()
+
+        with self.make_parser() as parser, self.make_checks():
+            futures = [
+                loop.run_in_executor(None, self.extract_table, table, parser)
+                for table in tables
+            ]
+
+            try:
+                async with engine.begin() as connection:
+                    await connection.run_sync(self.db.metadata.create_all)
+
+                    for table, future in zip(tables, futures):
+                        _, entries, table_stats = await future
+
+                        rows = self.track_keys(
+                            table, entries, file_keys, table_stats
+                        )
+
+                        for batch in self.insert_batches(
+                            table, rows, table_stats
+                        ):
+                            with table_stats.phase('flush'):
+                                await connection.execute(table.insert(), batch)
+
+                        stats.tables.append(table_stats)
+                        table_loaded.send(self.app, stats=table_stats)
+            except IntegrityError as e:
+                raise LoadError(e)
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        self.file_keys = file_keys
+        self.stats = stats
+        self.data_changed()
+
+        tables_loaded.send(self.app, stats=stats)
+
+    def load_pending(self, table: Table):
+        """
+        Load the given table (after the tables it references) if it hasn't
+        been loaded yet. This is a no-op unless `FILEALCHEMY_LAZY` is set.
+        """
+
+        with self._pending_lock:
+            if table.name not in self.pending:
+                return
+
+            self.pending.discard(table.name)
+
+            try:
+                for constraint in table.foreign_key_constraints:
+                    if constraint.referred_table is not table:
+                        self.load_pending(constraint.referred_table)
+
+                with self.make_parser() as parser:
+                    with Session(self._engine) as session, session.begin():
+                        self.load_table(session, table, parser, self.file_keys)
+            except Exception:
+                self.pending.add(table.name)
+                raise
+
+            self.data_changed()
+
+    def data_changed(self):
+        """
+        Called whenever the loaded data changes. Invalidates the query cache
+        and makes sure the `do_orm_execute` hook is in place if lazy loading
+        or query caching is enabled.
+        """
+
+        if self.query_cache is not None:
+            self.query_cache.invalidate()
+
+        if not self.lazy and self.query_cache is None:
+            return
+
+        if not event.contains(
+            self.db.session, 'do_orm_execute', self._on_orm_execute
+        ):
+            event.listen(
+                self.db.session, 'do_orm_execute', self._on_orm_execute
+            )
+
+    def _on_orm_execute(self, orm_execute_state):
+        if self.pending:
+            for mapper in orm_execute_state.all_mappers:
+                for table in mapper.tables:
+                    self.load_pending(table)
+
+        if self.query_cache is not None:
+            return self.query_cache.execute(orm_execute_state)
+
+    def sync(self):
+        """
+        Apply the changes made to the data directory since the last load (or
+        sync) to the database, touching only the rows read from files which
+        were added, modified, or removed. Return whether anything changed.
+
+        Tables with rows whose primary keys are generated by the database
+        (like autoincrement ids) are reloaded as a whole when any of those
+        rows change, since there's no telling which rows came from which file.
+        """
+
+        if self.shared_path:
+            raise LoadError(_fmt_log('shared databases cannot be synced'))
+
+        with self.app.app_context():
+            manifest = scan_data_dir(self.data_dir)
+
+            changed = {
+                path
+                for path, stat in manifest.items()
+                if self.manifest.get(path) != stat
+            }
+            removed = set(self.manifest) - set(manifest)
+
+            if not changed and not removed:
+                return False
+
+            tables = self.db.metadata.sorted_tables
+            file_keys = dict(self.file_keys)
+
+            deletes = {}
+            upserts = {}
+
+            # use a session (and connection) of its own instead of the app's
+            # scoped session, so that syncing in the background doesn't
+            # interfere with requests
+            session = Session(self.db.engine)
+
+            with self.make_parser() as parser, session, session.begin():
+                for table in tables:
+                    if table.name in self.pending:
+                        # picked up with the latest files once it's loaded
+                        continue
+
+                    prefix = table.name + '/'
+
+                    table_changed = {
+                        path for path in changed if path.startswith(prefix)
+                    }
+                    table_removed = {
+                        path for path in removed if path.startswith(prefix)
+                    }
+
+                    if not table_changed and not table_removed:
+                        continue
+
+                    stale = set()
+
+                    for path in table_changed | table_removed:
+                        stale.update(file_keys.pop(path, ()))
+
+                    files = {
+                        self.data_dir.joinpath(path).as_posix()
+                        for path in table_changed
+                    }
+
+                    if any(None in key for key in stale):
+                        # the keys of rows left to the database (like
+                        # autoincrement ids) aren't known, so the stale rows
+                        # can't be told apart: reload the whole table
+                        for path in list(file_keys):
+                            if path.startswith(prefix):
+                                del file_keys[path]
+
+                        stale = None
+                        files = None
+
+                    if table_changed or files is None:
+                        model, loader = self.resolve(table)
+
+                        rows = list(
+                            self.track_keys(
+                                table,
+                                loader.extract_entries(parser, files),
+                                file_keys,
                             )
                         )
+                    else:
+                        model, rows = None, []
+
+                    if stale is not None:
+                        stale -= {self.primary_key(table, row) for row in rows}
+
+                    deletes[table] = stale
+                    upserts[table] = model, rows
+
+                try:
+                    # delete children before their parents and insert parents
+                    # before their children so that foreign keys stay valid
+                    for table in reversed(tables):
+                        if table not in deletes:
+                            continue
+
+                        if deletes[table] is None:
+                            session.execute(delete(table))
+                        elif deletes[table]:
+                            self.delete_rows(session, table, deletes[table])
+
+                    for table in tables:
+                        model, rows = upserts.get(table, (None, ()))
 
-                    try:
-                        for record in loader.extract_records(model):
-                            session.add(record)
+                        for row in rows:
+                            session.merge(model(**row))
 
-                        session.flush()
-                    except IntegrityError as e:
-                        raise LoadError(e)
+                    session.flush()
+                except IntegrityError as e:
+                    raise LoadError(e)
+
+            self.manifest = manifest
+            self.file_keys = file_keys
+            self.data_changed()
+
+        return True
+
+    def watch(self, **kwargs):
+        """
+        Start syncing changes made to the data directory in the background
+        and return the (started) `Watcher`. Keyword arguments are passed on
+        to `Watcher`.
+        """
+
+        with self.app.app_context():
+            if isinstance(self.db.engine.pool, StaticPool):
+                self.app.logger.warning(
+                    _fmt_log(
+                        'the database uses a single connection (like '
+                        'in-memory SQLite databases), so requests may see '
+                        'changes being synced half-way through'
+                    )
+                )
+
+        return Watcher(self, **kwargs).start()
+
+    def resolve(self, table: Table):
+        """
+        Return the `(model, loader)` pair for the given table.
+        """
+
+        model = self.model_for(table)
+
+        if not model:
+            raise LoadError(
+                _fmt_log('no model found for {}'.format(table.name))
+            )
+
+        loader = loader_for(self.data_dir, table)
+
+        if not loader:
+            raise LoadError(
+                _fmt_log('no loader found for {}'.format(table.name))
+            )
+
+        return model, loader
+
+    def track_keys(
+        self, table: Table, entries, file_keys, stats: TableStats = None
+    ):
+        """
+        Yield the rows from the given `(file, row)` entries, recording the
+        primary keys read from each file in `file_keys` (and the number of
+        files, bytes, and records read in `stats`). Rows are converted and
+        validated first if `FILEALCHEMY_VALIDATE` is set.
+        """
+
+        last_file, keys = None, None
+        key_names = tuple(column.name for column in table.primary_key)
+        convert = self.row_converter(table) if self.validate_rows else None
+        check = self.checks and self.checks.table_checker(table)
+
+        for file_, row in entries:
+            if convert is not None:
+                row = convert(file_, row)
+
+            if check is not None:
+                check(file_, row)
+
+            if file_ != last_file:
+                path = Path(file_).relative_to(self.data_dir).as_posix()
+                keys = file_keys.setdefault(path, [])
+                last_file = file_
+
+                if stats is not None:
+                    stats.files += 1
+                    stats.bytes += self.manifest.get(path, (0, 0))[1]
+
+            keys.append(tuple(map(row.get, key_names)))
+
+            if stats is not None:
+                stats.records += 1
+
+            yield row
+
+    def row_converter(self, table: Table):
+        converter = self.row_converters.get(table.name)
+
+        if converter is None:
+            converter = self.row_converters[table.name] = RowConverter(table)
+
+        return converter
+
+    def primary_key(self, table: Table, row):
+        return tuple(row.get(column.name) for column in table.primary_key)
+
+    def insert_rows(
+        self, session, table: Table, rows, stats: TableStats = None
+    ):
+        """
+        Insert the given rows using batched Core `INSERT` statements,
+        bypassing the ORM unit of work.
+        """
+
+        stats = stats or TableStats(table.name)
+
+        for batch in self.insert_batches(table, rows, stats):
+            with stats.phase('flush'):
+                session.execute(table.insert(), batch)
+
+    def insert_batches(self, table: Table, rows, stats: TableStats = None):
+        """
+        Yield the given rows in batches (of up to `FILEALCHEMY_BATCH_SIZE`
+        rows) which can each be passed to a single `INSERT` statement.
+        """
+
+        defaulted = {
+            column.name
+            for column in table.columns
+            if column.default is not None
+            or column.server_default is not None
+            or column is table.autoincrement_column
+        }
+
+        stats = stats or TableStats(table.name)
+        rows = iter(rows)
+
+        while True:
+            batch = list(islice(rows, self.batch_size))
+
+            if not batch:
+                break
+
+            with stats.phase('construct'):
+                # mirror the ORM, which leaves out `None` values for columns
+                # with defaults (and for autoincrement columns) so that the
+                # database fills them in
+                groups = {}
+
+                for row in batch:
+                    row = {
+                        key: value
+                        for key, value in row.items()
+                        if value is not None or key not in defaulted
+                    }
+                    groups.setdefault(frozenset(row), []).append(row)
+
+            yield from groups.values()
+
+    def delete_rows(self, session, table: Table, keys):
+        columns = list(table.primary_key)
+        keys = list(keys)
+
+        for offset in range(0, len(keys), self.batch_size):
+            batch = keys[offset : offset + self.batch_size]
+
+            if len(columns) == 1:
+                clause = columns[0].in_([key[0] for key in batch])
+            else:
+                clause = tuple_(*columns).in_(batch)
+
+            session.execute(delete(table).where(clause))
 
     @contextmanager
-    def make_session(self):
+    def make_parser(self):
+        """
+        Parse files in a pool of worker processes if `FILEALCHEMY_WORKERS` is
+        set, leaving the database writes to the current thread. Parsed files
+        are cached on disk if `FILEALCHEMY_CACHE_PATH` is set.
+        """
+
+        set_yaml_backend(self.yaml_backend)
+
+        cache = None
+
+        if self.cache_path:
+            cache = ParseCache(self.cache_path, self.cache_max_size)
+
+        try:
+            if not self.workers or self.workers < 2:
+                yield FileParser(cache=cache, stream_size=self.stream_size)
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=set_yaml_backend,
+                    initargs=(self.yaml_backend,),
+                ) as executor:
+                    yield FileParser(
+                        executor, cache, stream_size=self.stream_size
+                    )
+        finally:
+            if cache is not None:
+                cache.close()
+
+    @contextmanager
+    def make_checks(self):
+        """
+        Check primary and foreign keys of the rows loaded within the block if
+        `FILEALCHEMY_CHECK_INTEGRITY` is set.
+        """
+
+        if self.check_integrity:
+            self.checks = IntegrityChecks(self.db.metadata.sorted_tables)
+
+        try:
+            yield self.checks
+        finally:
+            self.checks = None
+
+    @contextmanager
+    def make_session(self, stats: LoadStats = None):
         try:
             session = self.db.session
 
@@ -69,7 +1038,11 @@ class FileAlchemy:
             session.rollback()
             raise
         else:
+            start = perf_counter()
             session.commit()
+
+            if stats is not None:
+                stats.commit += perf_counter() - start
         finally:
             session.close()
 
@@ -77,6 +1050,4 @@ class FileAlchemy:
         return self.data_dir.joinpath(table.name)
 
     def model_for(self, table: Table):
-        for model in self.models:
-            if model.__tablename__ == table.name:
-                return model
+        return self.models_by_table.get(table.name)
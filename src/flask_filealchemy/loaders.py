@@ -1,32 +1,168 @@
+import csv
+import os
+from functools import cached_property
+from itertools import islice
 from pathlib import Path
 
-import frontmatter
+from sqlalchemy import types
 from sqlalchemy.schema import Table
 
-from .common import parse_yaml_file
+from .common import (
+    _fmt_log,
+    FileParser,
+    iter_json_lines_file,
+    iter_yaml_file,
+    LoadError,
+    parse_frontmatter_file,
+    parse_json_file,
+    parse_yaml_file,
+)
+from .content import DeferredText, parse_frontmatter_reference
+from .converters import convert_column, converter_for
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
 
 
 class InvalidLoaderError(Exception):
     pass
 
 
+class DirectoryListing:
+    """
+    DirectoryListing holds the result of a single `os.scandir` pass over a
+    table directory, so that choosing a loader and extracting records from it
+    don't have to list (and stat) the directory over and over again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path.as_posix()
+        self.exists = True
+
+        # names of all the entries, their extensions, and paths of the
+        # regular files among them
+        self.names = []
+        self.extensions = set()
+        self.files = {}
+
+        try:
+            with os.scandir(self.path) as entries:
+                for entry in entries:
+                    self.names.append(entry.name)
+                    self.extensions.add(os.path.splitext(entry.name)[1])
+
+                    if entry.is_file():
+                        self.files[entry.name] = '{}/{}'.format(
+                            self.path, entry.name
+                        )
+        except OSError:
+            self.exists = False
+
+
+class RowMapper:
+    """
+    RowMapper turns parsed values into a row for a table.
+
+    The column names are looked up once when the mapper is created, so that
+    mapping a row only takes a single pass over a tuple of keys. If a
+    `content_column` is given, that column is left out of the lookup and set
+    to the content passed along with the values instead.
+    """
+
+    def __init__(self, table: Table, content_column: str = None):
+        self.keys = tuple(
+            column.name
+            for column in table.columns
+            if column.name != content_column
+        )
+        self.content_column = content_column
+
+    def __call__(self, values, content=None):
+        row = dict(zip(self.keys, map(values.get, self.keys)))
+
+        if self.content_column is not None:
+            row[self.content_column] = content
+
+        return row
+
+
 class BaseLoader:
     """
     Base class for all Loader classes.
+
+    Subclasses decide whether they can load a table directory by implementing
+    `matches`, and can be made available to `loader_for` using
+    `register_loader`. Loaders which set `columnar` also implement
+    `extract_batches`, which `FileAlchemy` then uses to insert their records
+    in batches without mapping them to rows (or model instances) one by one.
     """
 
-    def __init__(self, data_dir: Path, table: Table):
+    columnar = False
+
+    def __init__(
+        self, data_dir: Path, table: Table, listing: DirectoryListing = None
+    ):
         self.data_dir = data_dir
         self.table = table
+        self._listing = listing
 
         self.validate()
 
-    def extract_records(self, model):
+    @property
+    def listing(self):
+        if self._listing is None:
+            self._listing = DirectoryListing(
+                self.data_dir.joinpath(self.table.name)
+            )
+
+        return self._listing
+
+    @cached_property
+    def row_mapper(self):
+        return RowMapper(self.table)
+
+    def extract_records(self, model, parser: FileParser = None):
+        for row in self.extract_rows(parser):
+            yield model(**row)
+
+    def extract_rows(self, parser: FileParser = None):
+        for _, row in self.extract_entries(parser):
+            yield row
+
+    def extract_entries(self, parser: FileParser = None, files=None):
+        """
+        Yield `(file, row)` tuples, where `file` is the path of the file the
+        row was read from. If `files` is given, only rows from those files
+        are extracted.
+        """
+
         raise NotImplementedError()
 
-    def validate(self):
+    def extract_batches(
+        self, parser: FileParser = None, files=None, batch_size: int = 1000
+    ):
+        """
+        Yield `(file, data)` tuples, where `data` maps every column name of
+        the table to a list of (up to `batch_size`) values read from `file`.
+        """
+
         raise NotImplementedError()
 
+    @classmethod
+    def matches(cls, listing: DirectoryListing):
+        """
+        Return whether this loader can load the directory with the given
+        listing.
+        """
+
+        raise NotImplementedError()
+
+    def validate(self):
+        if not self.matches(self.listing):
+            raise InvalidLoaderError()
+
 
 class YAMLFileLoader(BaseLoader):
     """
@@ -36,37 +172,284 @@ class YAMLFileLoader(BaseLoader):
     Please note that while the existence of this file is a necessary
     requirement, this loader would still be chosen if the directory contains
     other files.
+
+    Large files (as configured on the parser) are streamed one record at a
+    time, in which case the file may also contain multiple documents.
     """
 
     @property
     def data_path(self):
         return self.data_dir.joinpath(self.table.name).joinpath('_all.yml')
 
-    def extract_records(self, model):
-        values = parse_yaml_file(self.data_path.as_posix())
+    def extract_entries(self, parser: FileParser = None, files=None):
+        parser = parser or FileParser()
+
+        path = self.data_path.as_posix()
+
+        if files is not None and path not in files:
+            return
+
+        if parser.should_stream(path):
+            values = iter_yaml_file(path)
+        else:
+            values = parser.parse_one(parse_yaml_file, path)
+
+        row_mapper = self.row_mapper
 
         for value in values:
-            kwargs = {
-                column.name: value.get(column.name)
-                for column in self.table.columns
+            yield path, row_mapper(value)
+
+    @classmethod
+    def matches(cls, listing: DirectoryListing):
+        return '_all.yml' in listing.files
+
+
+class _JSONTemporalMixin:
+    """
+    JSON has no date and time types, so values of date, datetime, and time
+    columns are parsed from ISO 8601 strings (which YAML does on its own).
+    """
+
+    @cached_property
+    def temporal_converters(self):
+        temporal = (types.Date, types.DateTime, types.Time)
+
+        return tuple(
+            (column.name, converter_for(column.type))
+            for column in self.table.columns
+            if isinstance(column.type, temporal)
+            and converter_for(column.type) is not None
+        )
+
+    def convert_temporal(self, file_: str, row):
+        for name, converter in self.temporal_converters:
+            value = row.get(name)
+
+            if isinstance(value, str):
+                try:
+                    row[name] = converter(value)
+                except ValueError as e:
+                    raise LoadError(
+                        _fmt_log('{}: invalid {} ({})'.format(file_, name, e))
+                    )
+
+        return row
+
+
+class JSONLinesFileLoader(_JSONTemporalMixin, BaseLoader):
+    """
+    JSONLinesFileLoader is used to load records from directories which contain
+    a `_all.jsonl` file, with one JSON object per line.
+
+    The file is always streamed one record at a time.
+    """
+
+    @property
+    def data_path(self):
+        return self.data_dir.joinpath(self.table.name).joinpath('_all.jsonl')
+
+    def extract_entries(self, parser: FileParser = None, files=None):
+        path = self.data_path.as_posix()
+
+        if files is not None and path not in files:
+            return
+
+        row_mapper = self.row_mapper
+
+        for value in iter_json_lines_file(path):
+            yield path, self.convert_temporal(path, row_mapper(value))
+
+    @classmethod
+    def matches(cls, listing: DirectoryListing):
+        return '_all.jsonl' in listing.files
+
+
+class _ColumnarFileLoader(BaseLoader):
+    """
+    Base class for loaders reading all records of a table from a single
+    `file_name` file, one batch of columns at a time.
+    """
+
+    columnar = True
+    file_name = None
+
+    @property
+    def data_path(self):
+        return self.data_dir.joinpath(self.table.name).joinpath(self.file_name)
+
+    def extract_entries(self, parser: FileParser = None, files=None):
+        for file_, data in self.extract_batches(parser, files):
+            names = list(data)
+
+            for values in zip(*data.values()):
+                yield file_, dict(zip(names, values))
+
+    def extract_batches(
+        self, parser: FileParser = None, files=None, batch_size: int = 1000
+    ):
+        path = self.data_path.as_posix()
+
+        if files is not None and path not in files:
+            return
+
+        names = [column.name for column in self.table.columns]
+
+        for size, data in self.iter_batches(path, batch_size):
+            yield path, {
+                name: data[name] if name in data else [None] * size
+                for name in names
             }
 
-            yield model(**kwargs)
+    def iter_batches(self, path: str, batch_size: int):
+        """
+        Yield `(size, data)` tuples, where `data` maps column names (only of
+        columns present in the file) to lists of `size` values.
+        """
 
-    def validate(self):
-        all_ = self.data_path
+        raise NotImplementedError()
 
-        if not all_.exists() or not all_.is_file():
-            raise InvalidLoaderError()
+    @classmethod
+    def matches(cls, listing: DirectoryListing):
+        return cls.file_name in listing.files
 
 
-class _DirectoryLoaderValidateMixin:
-    def validate(self):
-        for file_ in self.data_path.iterdir():
-            if not any(
-                ext for ext in self.extensions if file_.name.endswith(ext)
+class CSVFileLoader(_ColumnarFileLoader):
+    """
+    CSVFileLoader is used to load records from directories which contain a
+    `_all.csv` file (with a header row naming the columns).
+
+    Values are converted to the types of their columns one column at a time,
+    and empty values are treated as missing.
+    """
+
+    file_name = '_all.csv'
+
+    @cached_property
+    def converters(self):
+        return {
+            column.name: converter_for(column.type)
+            for column in self.table.columns
+        }
+
+    def iter_batches(self, path: str, batch_size: int):
+        try:
+            # spreadsheet applications like to start files with a byte order
+            # mark, which would otherwise end up in the first column name
+            with open(path, newline='', encoding='utf-8-sig') as fd:
+                reader = csv.reader(fd)
+                header = next(reader, [])
+
+                indexes = [
+                    (index, name)
+                    for index, name in enumerate(header)
+                    if name in self.converters
+                ]
+
+                if header and not indexes:
+                    raise LoadError(
+                        _fmt_log(
+                            '{}: no columns of {} in the header'.format(
+                                path, self.table.name
+                            )
+                        )
+                    )
+
+                rows = self.checked_rows(path, reader, len(header))
+
+                while True:
+                    batch = list(islice(rows, batch_size))
+
+                    if not batch:
+                        break
+
+                    yield len(batch), self.convert(path, batch, indexes)
+        except IOError:
+            raise LoadError(_fmt_log('could not open {}'.format(path)))
+        except (csv.Error, UnicodeDecodeError):
+            raise LoadError(_fmt_log('{} contains invalid CSV'.format(path)))
+
+    def checked_rows(self, path: str, reader, width: int):
+        """
+        Yield the rows from `reader`, making sure each one has `width`
+        fields.
+        """
+
+        for row in reader:
+            if len(row) != width:
+                raise LoadError(
+                    _fmt_log(
+                        '{} line {}: expected {} fields'.format(
+                            path, reader.line_num, width
+                        )
+                    )
+                )
+
+            yield row
+
+    def convert(self, path: str, rows, indexes):
+        columns = list(zip(*rows))
+        data = {}
+
+        for index, name in indexes:
+            try:
+                data[name] = convert_column(
+                    self.converters[name], columns[index]
+                )
+            except (TypeError, ValueError) as e:
+                raise LoadError(
+                    _fmt_log('{}: invalid {} ({})'.format(path, name, e))
+                )
+
+        return data
+
+
+class ParquetFileLoader(_ColumnarFileLoader):
+    """
+    ParquetFileLoader is used to load records from directories which contain a
+    `_all.parquet` file. Only available if `pyarrow` is installed.
+
+    Values are used with the types they're stored with in the file.
+    """
+
+    file_name = '_all.parquet'
+
+    def iter_batches(self, path: str, batch_size: int):
+        try:
+            parquet_file = pq.ParquetFile(path)
+
+            names = [
+                column.name
+                for column in self.table.columns
+                if column.name in parquet_file.schema_arrow.names
+            ]
+
+            for batch in parquet_file.iter_batches(
+                batch_size=batch_size, columns=names
             ):
-                raise InvalidLoaderError()
+                yield batch.num_rows, batch.to_pydict()
+        except ValueError:
+            raise LoadError(
+                _fmt_log('{} contains invalid Parquet'.format(path))
+            )
+        except IOError:
+            raise LoadError(_fmt_log('could not open {}'.format(path)))
+
+    @classmethod
+    def matches(cls, listing: DirectoryListing):
+        return pq is not None and super().matches(listing)
+
+
+class _DirectoryLoaderValidateMixin:
+    def files(self, files=None):
+        return [
+            path
+            for path in self.listing.files.values()
+            if files is None or path in files
+        ]
+
+    @classmethod
+    def matches(cls, listing: DirectoryListing):
+        return listing.exists and listing.extensions.issubset(cls.extensions)
 
 
 class YAMLDirectoryLoader(_DirectoryLoaderValidateMixin, BaseLoader):
@@ -81,23 +464,42 @@ class YAMLDirectoryLoader(_DirectoryLoaderValidateMixin, BaseLoader):
     def data_path(self):
         return self.data_dir.joinpath(self.table.name)
 
-    def extract_records(self, model):
-        for entry in self.data_path.iterdir():
-            if not entry.is_file():
-                continue
+    def extract_entries(self, parser: FileParser = None, files=None):
+        parser = parser or FileParser()
 
-            values = parse_yaml_file(
-                self.data_dir.joinpath(self.table.name)
-                .joinpath(entry.name)
-                .as_posix()
-            )
+        files_ = self.files(files)
+        row_mapper = self.row_mapper
 
-            kwargs = {
-                column.name: values.get(column.name)
-                for column in self.table.columns
-            }
+        for file_, values in zip(
+            files_, parser.parse(parse_yaml_file, files_)
+        ):
+            yield file_, row_mapper(values)
 
-            yield model(**kwargs)
+
+class JSONDirectoryLoader(
+    _JSONTemporalMixin, _DirectoryLoaderValidateMixin, BaseLoader
+):
+    """
+    JSONDirectoryLoader is used to load records from directories which contain
+    only JSON files, each containing a single object.
+    """
+
+    extensions = ('.json', '.JSON')
+
+    @property
+    def data_path(self):
+        return self.data_dir.joinpath(self.table.name)
+
+    def extract_entries(self, parser: FileParser = None, files=None):
+        parser = parser or FileParser()
+
+        files_ = self.files(files)
+        row_mapper = self.row_mapper
+
+        for file_, values in zip(
+            files_, parser.parse(parse_json_file, files_)
+        ):
+            yield file_, self.convert_temporal(file_, row_mapper(values))
 
 
 class MarkdownFrontmatterDirectoryLoader(
@@ -106,6 +508,9 @@ class MarkdownFrontmatterDirectoryLoader(
     """
     MarkdownFrontmatterDirectoryLoader is used to load records from directories
     which contain only markdown/front-matter formatted files.
+
+    If the content column is a `DeferredText` column, only a reference to the
+    body of each file is loaded, and the body is read when it's accessed.
     """
 
     extensions = ('.md', '.MD', '.markdown')
@@ -115,36 +520,77 @@ class MarkdownFrontmatterDirectoryLoader(
     def data_path(self):
         return self.data_dir.joinpath(self.table.name)
 
-    def extract_records(self, model):
-        for entry in self.data_path.iterdir():
-            if not entry.is_file():
-                continue
+    @cached_property
+    def row_mapper(self):
+        return RowMapper(self.table, self.content_column_name)
 
-            values = frontmatter.load(
-                self.data_dir.joinpath(self.table.name)
-                .joinpath(entry.name)
-                .as_posix()
-            )
+    @property
+    def parse_fn(self):
+        column = self.table.columns.get(self.content_column_name)
 
-            kwargs = {
-                column.name: values.get(column.name)
-                for column in self.table.columns
-                if column.name != self.content_column_name
-            }
-            kwargs[self.content_column_name] = values.content
+        if column is not None and isinstance(column.type, DeferredText):
+            return parse_frontmatter_reference
+
+        return parse_frontmatter_file
+
+    def extract_entries(self, parser: FileParser = None, files=None):
+        parser = parser or FileParser()
 
-            yield model(**kwargs)
+        files_ = self.files(files)
+        row_mapper = self.row_mapper
+
+        parse_fn = self.parse_fn
+
+        for file_, (values, content) in zip(
+            files_, parser.parse(parse_fn, files_)
+        ):
+            if parse_fn is parse_frontmatter_reference:
+                # keep references valid when the data directory is moved
+                content = content._replace(
+                    path=Path(file_).relative_to(self.data_dir).as_posix()
+                )
+
+            yield file_, row_mapper(values, content)
+
+
+# loader classes in the order in which they're tried
+LOADERS = [
+    MarkdownFrontmatterDirectoryLoader,
+    YAMLFileLoader,
+    JSONLinesFileLoader,
+    CSVFileLoader,
+    ParquetFileLoader,
+    YAMLDirectoryLoader,
+    JSONDirectoryLoader,
+]
+
+
+def register_loader(cls, first: bool = False):
+    """
+    Make the given `BaseLoader` subclass available to `loader_for`. Loaders
+    are tried in the order they were registered in (after the built-in ones),
+    unless `first` is set. Can also be used as a class decorator.
+    """
+
+    if cls in LOADERS:
+        LOADERS.remove(cls)
+
+    if first:
+        LOADERS.insert(0, cls)
+    else:
+        LOADERS.append(cls)
+
+    return cls
 
 
 def loader_for(data_dir: Path, table: Table):
-    for cls in (
-        MarkdownFrontmatterDirectoryLoader,
-        YAMLFileLoader,
-        YAMLDirectoryLoader,
-    ):
-        try:
-            loader = cls(data_dir, table)
-        except InvalidLoaderError:
-            pass
-        else:
-            return loader
+    """
+    Return a loader for the given table, or `None` if no registered loader
+    can load its directory.
+    """
+
+    listing = DirectoryListing(data_dir.joinpath(table.name))
+
+    for cls in LOADERS:
+        if cls.matches(listing):
+            return cls(data_dir, table, listing)
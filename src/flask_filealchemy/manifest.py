@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+def scan_data_dir(data_dir: Path):
+    """
+    Return a mapping of `<table>/<file>` paths (relative to the data
+    directory) to `(mtime_ns, size)` tuples for every file that could be
+    loaded.
+    """
+
+    manifest = {}
+
+    with os.scandir(data_dir) as tables:
+        for table in tables:
+            if not table.is_dir():
+                continue
+
+            with os.scandir(table.path) as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
+
+                    stat = entry.stat()
+
+                    manifest['{}/{}'.format(table.name, entry.name)] = (
+                        stat.st_mtime_ns,
+                        stat.st_size,
+                    )
+
+    return manifest
+
+
+def fingerprint(manifest, metadata):
+    """
+    Return a digest identifying both the state of the data directory and the
+    schema it was loaded into.
+    """
+
+    schema = [
+        (table.name, [(column.name, str(column.type)) for column in table.c])
+        for table in metadata.sorted_tables
+    ]
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps(schema).encode('utf-8'))
+    digest.update(json.dumps(sorted(manifest.items())).encode('utf-8'))
+
+    return digest.hexdigest()
+
+
+def content_fingerprint(data_dir: Path, metadata):
+    """
+    Return a digest identifying the contents of the data directory and the
+    schema it was loaded into.
+
+    Unlike `fingerprint`, this only depends on what the files contain, so it
+    stays the same when the data directory is copied somewhere else.
+    """
+
+    contents = {}
+
+    for path in scan_data_dir(data_dir):
+        with open(data_dir.joinpath(path), 'rb') as fd:
+            contents[path] = hashlib.sha256(fd.read()).hexdigest()
+
+    return fingerprint(contents, metadata)
@@ -0,0 +1,124 @@
+import threading
+from collections import OrderedDict
+
+from sqlalchemy.orm import loading, Session
+
+
+class QueryCache:
+    """
+    QueryCache keeps the results of ORM `SELECT` statements around, so that
+    running the same statement with the same parameters again doesn't have
+    to go to the database.
+
+    Since the data only changes when it's (re)loaded from the data directory,
+    results are keyed by a version token which `invalidate` bumps after every
+    load or sync, along with the statement and its parameters. Up to
+    `max_size` results are kept, evicting the least recently used ones first.
+
+    A QueryCache can be shared between threads.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self.version = 0
+
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def invalidate(self):
+        with self.lock:
+            self.version += 1
+            self.entries.clear()
+
+    def key(self, orm_execute_state):
+        """
+        Return the cache key for the given execution, or `None` if its result
+        shouldn't be cached.
+        """
+
+        if not orm_execute_state.is_select:
+            return None
+
+        if not orm_execute_state.all_mappers:
+            return None
+
+        if orm_execute_state.execution_options.get('populate_existing'):
+            return None
+
+        cache_key = orm_execute_state.statement._generate_cache_key()
+
+        if cache_key is None:
+            return None
+
+        bound = tuple(param.effective_value for param in cache_key.bindparams)
+        parameters = orm_execute_state.parameters or {}
+
+        return (
+            self.version,
+            cache_key.key,
+            repr(bound),
+            repr(sorted(parameters.items())),
+        )
+
+    def get(self, key):
+        with self.lock:
+            frozen = self.entries.get(key)
+
+            if frozen is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+
+        return frozen
+
+    def set(self, key, frozen):
+        with self.lock:
+            if key[0] != self.version:
+                # invalidated while the statement was running
+                return
+
+            self.entries[key] = frozen
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def execute(self, orm_execute_state):
+        """
+        Return the (possibly cached) result for the given execution, or
+        `None` to let it run as usual. Meant to be called from a
+        `do_orm_execute` event handler.
+        """
+
+        key = self.key(orm_execute_state)
+
+        if key is None:
+            return None
+
+        frozen = self.get(key)
+
+        if frozen is None:
+            result = orm_execute_state.invoke_statement().freeze()
+
+            # keep detached copies of the instances, so that the cached ones
+            # aren't expired or modified along with the ones in the session
+            with Session() as session:
+                frozen = loading.merge_frozen_result(
+                    session, orm_execute_state.statement, result, load=False
+                )
+
+            self.set(key, frozen)
+
+        return loading.merge_frozen_result(
+            orm_execute_state.session,
+            orm_execute_state.statement,
+            frozen,
+            load=False,
+        )()
@@ -0,0 +1,53 @@
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def shared_database_uri(path: str):
+    """
+    Return the `SQLALCHEMY_DATABASE_URI` to use for attaching to the shared
+    database at `path`.
+
+    The database is opened read-only and marked immutable, so that SQLite
+    skips locking and checking for changes made by other processes. Since a
+    rebuilt database replaces the file instead of writing to it, connections
+    which are already open keep reading the data they started with.
+    """
+
+    return 'sqlite:///file:{}?mode=ro&immutable=1&uri=true'.format(
+        Path(path).resolve().as_posix()
+    )
+
+
+# keep connections (along with their page caches) around, and never make
+# threads wait for one since reads don't block each other
+SHARED_ENGINE_OPTIONS = {
+    'connect_args': {'check_same_thread': False},
+    'pool_size': 8,
+    'max_overflow': -1,
+}
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Hold an exclusive lock on the file at `path` (which is created if needed)
+    for the duration of the block.
+
+    Without `fcntl` the lock is a no-op, in which case several processes may
+    end up building the same database (which is still replaced atomically).
+    """
+
+    with open(path, 'a') as fd:
+        if fcntl is not None:
+            fcntl.flock(fd.fileno(), fcntl.LOCK_EX)
+
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd.fileno(), fcntl.LOCK_UN)
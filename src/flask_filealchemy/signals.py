@@ -0,0 +1,9 @@
+from flask.signals import Namespace
+
+_signals = Namespace()
+
+#: Sent (with the `TableStats` as `stats`) after a table has been loaded.
+table_loaded = _signals.signal('filealchemy-table-loaded')
+
+#: Sent (with the `LoadStats` as `stats`) after `load_tables` committed.
+tables_loaded = _signals.signal('filealchemy-tables-loaded')
@@ -0,0 +1,80 @@
+import os
+import pickle
+import sqlite3
+
+from .common import _fmt_log, LoadError
+
+
+def _manifest_path(path: str):
+    return path + '.manifest'
+
+
+def _driver_connection(connection):
+    if connection.dialect.name != 'sqlite':
+        raise LoadError(_fmt_log('snapshots are only supported for SQLite'))
+
+    return connection.connection.driver_connection
+
+
+def save_snapshot(engine, path: str, fingerprint: str, state=None):
+    """
+    Copy the database behind `engine` into the file at `path` using the
+    SQLite backup API, and record the fingerprint of the data it contains
+    along with any additional `state` that should be restored with it.
+    """
+
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+
+    with engine.connect() as connection:
+        target = sqlite3.connect(tmp_path)
+
+        try:
+            _driver_connection(connection).backup(target)
+        finally:
+            target.close()
+
+    os.replace(tmp_path, path)
+
+    with open(_manifest_path(path), 'wb') as fd:
+        pickle.dump({'fingerprint': fingerprint, 'state': state}, fd)
+
+
+def snapshot_state(path: str, fingerprint: str):
+    """
+    Return the state saved along with the snapshot at `path` if it was taken
+    with the same fingerprint, and `None` otherwise.
+    """
+
+    try:
+        with open(_manifest_path(path), 'rb') as fd:
+            manifest = pickle.load(fd)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+    if manifest.get('fingerprint') != fingerprint or not os.path.isfile(path):
+        return None
+
+    return manifest.get('state') or {}
+
+
+def restore_snapshot(engine, path: str, fingerprint: str):
+    """
+    Restore the snapshot at `path` into the database behind `engine` if it
+    was taken with the same fingerprint. Return the state saved along with
+    the snapshot if it was restored, and `None` otherwise.
+    """
+
+    state = snapshot_state(path, fingerprint)
+
+    if state is None:
+        return None
+
+    with engine.connect() as connection:
+        source = sqlite3.connect(path)
+
+        try:
+            source.backup(_driver_connection(connection))
+        finally:
+            source.close()
+
+    return state
@@ -0,0 +1,107 @@
+from contextlib import contextmanager
+from time import perf_counter
+
+PHASES = ('scan', 'parse', 'construct', 'flush', 'commit')
+
+
+class TableStats:
+    """
+    TableStats collects the time spent in each phase of loading a table,
+    along with the number of files and bytes read and records loaded.
+
+    Phases are `scan` (choosing a loader), `parse` (reading files and mapping
+    them to rows), `construct` (building model instances or insert batches),
+    and `flush` (sending the rows to the database).
+    """
+
+    def __init__(self, table: str):
+        self.table = table
+        self.timings = dict.fromkeys(PHASES[:-1], 0.0)
+
+        self.files = 0
+        self.bytes = 0
+        self.records = 0
+
+    @contextmanager
+    def phase(self, name: str):
+        start = perf_counter()
+
+        try:
+            yield
+        finally:
+            self.timings[name] += perf_counter() - start
+
+    def timed(self, name: str, iterable):
+        """
+        Yield from `iterable`, adding the time spent waiting for each item to
+        the given phase.
+        """
+
+        iterator = iter(iterable)
+
+        while True:
+            start = perf_counter()
+
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.timings[name] += perf_counter() - start
+                return
+
+            self.timings[name] += perf_counter() - start
+
+            yield item
+
+    def as_dict(self):
+        return {
+            'table': self.table,
+            'timings': dict(self.timings),
+            'files': self.files,
+            'bytes': self.bytes,
+            'records': self.records,
+        }
+
+
+class LoadStats:
+    """
+    LoadStats aggregates the `TableStats` of a complete `load_tables` call,
+    plus the time spent committing.
+    """
+
+    def __init__(self):
+        self.tables = []
+        self.commit = 0.0
+
+    @property
+    def timings(self):
+        timings = dict.fromkeys(PHASES, 0.0)
+
+        for stats in self.tables:
+            for phase, seconds in stats.timings.items():
+                timings[phase] += seconds
+
+        timings['commit'] = self.commit
+
+        return timings
+
+    def as_dict(self):
+        return {
+            'tables': [stats.as_dict() for stats in self.tables],
+            'timings': self.timings,
+            'files': sum(stats.files for stats in self.tables),
+            'bytes': sum(stats.bytes for stats in self.tables),
+            'records': sum(stats.records for stats in self.tables),
+        }
+
+    def summary(self):
+        data = self.as_dict()
+
+        return 'loaded {} records from {} files ({} bytes) in {}'.format(
+            data['records'],
+            data['files'],
+            data['bytes'],
+            ', '.join(
+                '{} {:.3f}s'.format(phase, seconds)
+                for phase, seconds in data['timings'].items()
+            ),
+        )
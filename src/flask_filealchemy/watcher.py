@@ -0,0 +1,114 @@
+import threading
+
+from .common import _fmt_log
+
+try:
+    from watchdog.events import (
+        EVENT_TYPE_CREATED,
+        EVENT_TYPE_DELETED,
+        EVENT_TYPE_MODIFIED,
+        EVENT_TYPE_MOVED,
+        FileSystemEventHandler,
+    )
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+else:
+    # leave out opened and closed events, which reading files triggers
+    _CHANGES = frozenset(
+        (
+            EVENT_TYPE_CREATED,
+            EVENT_TYPE_DELETED,
+            EVENT_TYPE_MODIFIED,
+            EVENT_TYPE_MOVED,
+        )
+    )
+
+
+class _Handler(FileSystemEventHandler):
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def on_any_event(self, event):
+        if event.event_type in _CHANGES:
+            self.event.set()
+
+
+class Watcher:
+    """
+    Watcher keeps the database in sync with the data directory by calling
+    `FileAlchemy.sync` on a background thread.
+
+    If `watchdog` is installed, file system notifications (inotify, FSEvents,
+    ...) are used to find out about changes, and bursts of changes are
+    debounced until nothing has changed for `debounce` seconds. Otherwise (or
+    if `poll` is set), the data directory is checked every `interval`
+    seconds.
+    """
+
+    def __init__(
+        self,
+        file_alchemy,
+        interval: float = 1.0,
+        debounce: float = 0.5,
+        poll: bool = False,
+    ):
+        self.file_alchemy = file_alchemy
+        self.interval = interval
+        self.debounce = debounce
+        self.poll = poll or Observer is None
+
+        self._changed = threading.Event()
+        self._stopped = threading.Event()
+        self._observer = None
+        self._thread = threading.Thread(
+            target=self._run, name='filealchemy-watcher', daemon=True
+        )
+
+    def start(self):
+        if not self.poll:
+            self._observer = Observer()
+            self._observer.schedule(
+                _Handler(self._changed),
+                self.file_alchemy.data_dir.as_posix(),
+                recursive=True,
+            )
+            self._observer.start()
+
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._changed.set()
+
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if not self.poll:
+                self._changed.wait()
+
+                # wait for the burst of changes to settle down
+                while self._changed.is_set() and not self._stopped.is_set():
+                    self._changed.clear()
+                    self._stopped.wait(self.debounce)
+            else:
+                self._stopped.wait(self.interval)
+
+            if self._stopped.is_set():
+                break
+
+            try:
+                self.file_alchemy.sync()
+            except Exception:
+                # keep watching, the next change may well fix the problem
+                self.file_alchemy.app.logger.exception(
+                    _fmt_log('could not sync the data directory')
+                )
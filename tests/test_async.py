@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from sqlalchemy import Column, ForeignKey, select, String
+
+from flask_filealchemy import FileAlchemy, LoadError
+
+pytest.importorskip('aiosqlite')
+
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+
+def test_async_load_tables(db, app, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    class Book(db.Model):
+        __tablename__ = 'books'
+
+        slug = Column(String(255), primary_key=True)
+        author_slug = Column(
+            String(255), ForeignKey('authors.slug'), nullable=False
+        )
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    books_dir = data_dir.mkdir('books')
+
+    for index in range(5):
+        authors_dir.join('author-{}.yml'.format(index)).write(
+            'slug: author-{0}\nname: Author {0}\n'.format(index)
+        )
+        books_dir.join('book-{}.yml'.format(index)).write(
+            'slug: book-{0}\nauthor_slug: author-{0}\n'.format(index)
+        )
+
+    app.config['FILEALCHEMY_MODELS'] = (Author, Book)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_BATCH_SIZE'] = 2
+
+    async def load():
+        engine = create_async_engine('sqlite+aiosqlite://')
+
+        await FileAlchemy(app, db).async_load_tables(engine)
+
+        async with engine.connect() as connection:
+            authors = (await connection.execute(select(Author))).all()
+            books = (await connection.execute(select(Book))).all()
+
+        await engine.dispose()
+
+        return authors, books
+
+    authors, books = asyncio.run(load())
+
+    assert len(authors) == 5
+    assert len(books) == 5
+
+
+def test_async_load_tables_integrity_error(db, app, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    authors_dir.join('invalid.yml').write('slug: max-mustermann')
+
+    app.config['FILEALCHEMY_MODELS'] = (Author,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+
+    async def load():
+        engine = create_async_engine('sqlite+aiosqlite://')
+
+        try:
+            await FileAlchemy(app, db).async_load_tables(engine)
+        finally:
+            await engine.dispose()
+
+    with pytest.raises(LoadError):
+        asyncio.run(load())
@@ -0,0 +1,132 @@
+import shutil
+
+import pytest
+from sqlalchemy import Column, String
+from sqlalchemy.orm import deferred
+
+from flask_filealchemy import FileAlchemy, LoadError
+from flask_filealchemy.bundle import read_bundle, write_bundle
+from flask_filealchemy.content import DeferredText
+
+
+def test_bundle_roundtrip(tmpdir):
+    path = tmpdir.join('bundle').strpath
+
+    tables = {
+        'authors': (
+            ['slug', 'name'],
+            [['max-mustermann'], ['Max Mustermann']],
+            {'authors/max-mustermann.yml': [('max-mustermann',)]},
+        )
+    }
+
+    write_bundle(path, 'fingerprint', tables)
+
+    bundle = read_bundle(path)
+
+    assert bundle['fingerprint'] == 'fingerprint'
+    assert bundle['tables']['authors']['data'] == [
+        ['max-mustermann'],
+        ['Max Mustermann'],
+    ]
+
+
+def test_corrupt_bundle(tmpdir):
+    path = tmpdir.join('bundle')
+
+    write_bundle(path.strpath, 'fingerprint', {})
+
+    data = bytearray(path.read_binary())
+    data[-1] ^= 0xFF
+    path.write_binary(bytes(data))
+
+    with pytest.raises(LoadError):
+        read_bundle(path.strpath)
+
+
+def test_build_and_load_bundle(db, app, tmpdir, monkeypatch):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    authors_dir.join('max-mustermann.yml').write(
+        'slug: max-mustermann\nname: Max Mustermann\n'
+    )
+
+    bundle_path = tmpdir.join('data.bundle')
+
+    app.config['FILEALCHEMY_MODELS'] = (Author,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_BUNDLE_PATH'] = bundle_path.strpath
+
+    FileAlchemy(app, db)
+
+    result = app.test_cli_runner().invoke(args=['filealchemy', 'build'])
+
+    assert result.exit_code == 0, result.output
+    assert bundle_path.exists()
+
+    def load_all(*args, **kwargs):
+        raise AssertionError('bundle was not used')
+
+    monkeypatch.setattr(FileAlchemy, 'load_all', load_all)
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        author = db.session.execute(db.select(Author)).scalar_one()
+        assert author.name == 'Max Mustermann'
+
+        db.drop_all()
+
+    # changed files make the bundle stale
+    monkeypatch.undo()
+
+    authors_dir.join('erika-mustermann.yml').write(
+        'slug: erika-mustermann\nname: Erika Mustermann\n'
+    )
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        assert len(db.session.execute(db.select(Author)).all()) == 2
+
+
+def test_load_bundle_from_moved_data_dir(db, app, tmpdir):
+    class Post(db.Model):
+        __tablename__ = 'posts'
+
+        slug = Column(String(255), primary_key=True)
+        content = deferred(Column(DeferredText))
+
+    build_dir = tmpdir.mkdir('build')
+    data_dir = build_dir.mkdir('data')
+
+    data_dir.mkdir('posts').join('a.md').write(
+        '---\nslug: a\n---\n\nThe body.\n'
+    )
+
+    bundle_path = tmpdir.join('data.bundle')
+
+    app.config['FILEALCHEMY_MODELS'] = (Post,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_BUNDLE_PATH'] = bundle_path.strpath
+
+    FileAlchemy(app, db).build_bundle()
+
+    # like copying the data directory into a container
+    moved_dir = tmpdir.join('app', 'data')
+    shutil.copytree(data_dir.strpath, moved_dir.strpath)
+    shutil.rmtree(build_dir.strpath)
+
+    app.config['FILEALCHEMY_DATA_DIR'] = moved_dir.strpath
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        assert db.session.get(Post, 'a').content == 'The body.'
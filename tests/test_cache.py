@@ -0,0 +1,111 @@
+import os
+import sqlite3
+
+from flask_filealchemy.cache import ParseCache
+from flask_filealchemy.common import FileParser, parse_yaml_file
+
+
+def test_cache_hit(tmpdir):
+    file_ = tmpdir.join('author.yml')
+    file_.write('slug: max-mustermann')
+
+    cache = ParseCache(tmpdir.join('cache.db').strpath)
+    parser = FileParser(cache=cache)
+
+    assert parser.parse_one(parse_yaml_file, file_.strpath) == {
+        'slug': 'max-mustermann'
+    }
+
+    calls = []
+
+    def parse_fn(path):
+        calls.append(path)
+
+    parse_fn.__qualname__ = parse_yaml_file.__qualname__
+
+    assert parser.parse_one(parse_fn, file_.strpath) == {
+        'slug': 'max-mustermann'
+    }
+    assert not calls
+
+    cache.close()
+
+
+def test_cache_invalidated_on_change(tmpdir):
+    file_ = tmpdir.join('author.yml')
+    file_.write('slug: max-mustermann')
+
+    cache_path = tmpdir.join('cache.db').strpath
+
+    cache = ParseCache(cache_path)
+    FileParser(cache=cache).parse_one(parse_yaml_file, file_.strpath)
+    cache.close()
+
+    file_.write('slug: erika-mustermann')
+    stat = os.stat(file_.strpath)
+    os.utime(file_.strpath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+    cache = ParseCache(cache_path)
+
+    assert FileParser(cache=cache).parse_one(
+        parse_yaml_file, file_.strpath
+    ) == {'slug': 'erika-mustermann'}
+
+    cache.close()
+
+
+def test_cache_eviction(tmpdir):
+    files = []
+
+    for index in range(10):
+        file_ = tmpdir.join('author-{}.yml'.format(index))
+        file_.write('slug: author-{}'.format(index))
+        files.append(file_.strpath)
+
+    cache_path = tmpdir.join('cache.db').strpath
+
+    cache = ParseCache(cache_path, max_size=100)
+    list(FileParser(cache=cache).parse(parse_yaml_file, files))
+    cache.close()
+
+    cache = ParseCache(cache_path, max_size=100)
+    (total,) = cache.connection.execute(
+        'SELECT SUM(LENGTH(data)) FROM entries'
+    ).fetchone()
+
+    assert total <= 100
+
+    cache.close()
+
+
+def test_cache_shared_between_processes(tmpdir):
+    file_ = tmpdir.join('author.yml')
+    file_.write('slug: max-mustermann')
+
+    cache_path = tmpdir.join('cache.db').strpath
+    stat = os.stat(file_.strpath)
+
+    first = ParseCache(cache_path, batch_size=1)
+    second = ParseCache(cache_path, batch_size=1)
+
+    # writes don't keep a transaction open
+    first.set('parse', file_.strpath, stat, 1)
+    second.set('parse', file_.strpath, stat, 2)
+
+    assert second.get('parse', file_.strpath, stat) == (True, 2)
+
+    # and a database locked by someone else only means cache misses
+    locked = sqlite3.connect(cache_path, isolation_level=None)
+    locked.execute('BEGIN EXCLUSIVE')
+
+    third = ParseCache(cache_path, batch_size=1, timeout=0.1)
+    third.set('parse', 'other.yml', stat, 3)
+
+    assert third.get('parse', 'other.yml', stat) == (False, None)
+
+    third.close()
+    locked.execute('ROLLBACK')
+    locked.close()
+
+    first.close()
+    second.close()
@@ -0,0 +1,132 @@
+import pytest
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, String, Table
+
+from flask_filealchemy import LoadError
+from flask_filealchemy.checks import IntegrityChecks
+
+
+@pytest.fixture
+def tables():
+    metadata = MetaData()
+
+    authors = Table(
+        'authors',
+        metadata,
+        Column('slug', String(255), primary_key=True),
+        Column('email', String(255), unique=True),
+    )
+    books = Table(
+        'books',
+        metadata,
+        Column('id', Integer, primary_key=True),
+        Column('author_slug', ForeignKey('authors.slug')),
+        Column('editor_email', ForeignKey('authors.email')),
+        Column('sequel_of', ForeignKey('books.id')),
+    )
+
+    return authors, books
+
+
+def test_duplicate_primary_key(tables):
+    authors, _ = tables
+
+    check = IntegrityChecks(tables).table_checker(authors)
+    check('authors/first.yml', {'slug': 'max-mustermann'})
+
+    with pytest.raises(
+        LoadError,
+        match=r"authors/second.yml: duplicate authors 'max-mustermann' "
+        r'\(also in authors/first.yml\)',
+    ):
+        check('authors/second.yml', {'slug': 'max-mustermann'})
+
+
+def test_missing_references(tables):
+    authors, books = tables
+
+    checks = IntegrityChecks(tables)
+    checks.table_checker(authors)(
+        'authors/max.yml', {'slug': 'max', 'email': 'max@example.com'}
+    )
+
+    check = checks.table_checker(books)
+
+    # references to the same table are left to the database
+    check(
+        'books/first.yml',
+        {
+            'id': 1,
+            'author_slug': 'max',
+            'editor_email': 'max@example.com',
+            'sequel_of': 2,
+        },
+    )
+    check('books/second.yml', {'id': 2, 'author_slug': None})
+
+    with pytest.raises(
+        LoadError, match="books/third.yml: author_slug refers to missing"
+    ):
+        check('books/third.yml', {'id': 3, 'author_slug': 'erika'})
+
+    with pytest.raises(
+        LoadError, match="books/fourth.yml: editor_email refers to missing"
+    ):
+        check('books/fourth.yml', {'id': 4, 'editor_email': 'erika@'})
+
+
+def test_missing_primary_keys():
+    metadata = MetaData()
+
+    tags = Table(
+        'tags',
+        metadata,
+        Column('id', Integer, primary_key=True),
+        Column('name', String(255)),
+    )
+    post_tags = Table(
+        'post_tags',
+        metadata,
+        Column('post', String(255), primary_key=True),
+        Column('tag_id', ForeignKey('tags.id'), primary_key=True),
+    )
+
+    checks = IntegrityChecks([tags, post_tags])
+
+    # autoincrement keys are left to the database
+    check = checks.table_checker(tags)
+    check('tags/a.yml', {'id': None, 'name': 'a'})
+    check('tags/b.yml', {'id': None, 'name': 'b'})
+
+    # and so are references to them
+    checks.table_checker(post_tags)(
+        'post_tags/a.yml', {'post': 'a', 'tag_id': 1}
+    )
+
+
+def test_keys_compared_as_column_types():
+    metadata = MetaData()
+
+    years = Table(
+        'years',
+        metadata,
+        Column('slug', String(255), primary_key=True),
+    )
+    events = Table(
+        'events',
+        metadata,
+        Column('slug', String(255), primary_key=True),
+        Column('year_slug', String(255), ForeignKey('years.slug')),
+    )
+
+    checks = IntegrityChecks([years, events])
+
+    check = checks.table_checker(years)
+    check('years/y.yml', {'slug': 2020})
+
+    # the database stores both as '2020'
+    checks.table_checker(events)(
+        'events/e.yml', {'slug': 'e', 'year_slug': '2020'}
+    )
+
+    with pytest.raises(LoadError, match="duplicate years '2020'"):
+        check('years/z.yml', {'slug': '2020'})
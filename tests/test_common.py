@@ -0,0 +1,143 @@
+from textwrap import dedent
+
+import pytest
+
+from flask_filealchemy.common import (
+    iter_json_lines_file,
+    iter_yaml_file,
+    LoadError,
+    parse_json_file,
+    parse_yaml_file,
+    set_yaml_backend,
+    YAML_BACKENDS,
+)
+
+
+@pytest.fixture
+def backend():
+    yield set_yaml_backend
+
+    set_yaml_backend('auto')
+
+
+@pytest.mark.parametrize('name', sorted(YAML_BACKENDS))
+def test_yaml_backends_agree(backend, name, tmpdir):
+    file_ = tmpdir.join('values.yml')
+    file_.write(
+        dedent(
+            '''
+            string: yes
+            octal: 012
+            explicit_octal: 0o12
+            sexagesimal: 1:20
+            boolean: true
+            integer: 1_000
+            float: 1.5
+            negative_float: -.5
+            positive_float: +.5
+            date: 2020-01-01
+            empty: ~
+            '''
+        )
+    )
+
+    backend(name)
+
+    values = parse_yaml_file(file_.strpath)
+
+    assert values['string'] == 'yes'
+    assert values['octal'] == 12
+    assert values['explicit_octal'] == 10
+    assert values['sexagesimal'] == '1:20'
+    assert values['boolean'] is True
+    assert values['integer'] == 1000
+    assert values['float'] == 1.5
+    assert values['negative_float'] == -0.5
+    assert values['positive_float'] == 0.5
+    assert str(values['date']) == '2020-01-01'
+    assert values['empty'] is None
+
+    file_.write('slug: first\nslug: second\n')
+
+    with pytest.raises(LoadError):
+        parse_yaml_file(file_.strpath)
+
+
+def test_unknown_yaml_backend(backend):
+    with pytest.raises(LoadError):
+        backend('does-not-exist')
+
+
+def test_iter_yaml_file(tmpdir):
+    file_ = tmpdir.join('_all.yml')
+    file_.write(
+        dedent(
+            '''
+            - slug: max-mustermann
+              country: &germany Germany
+            - slug: erika-mustermann
+              country: *germany
+            '''
+        )
+    )
+
+    assert list(iter_yaml_file(file_.strpath)) == [
+        {'slug': 'max-mustermann', 'country': 'Germany'},
+        {'slug': 'erika-mustermann', 'country': 'Germany'},
+    ]
+
+
+def test_iter_yaml_file_multiple_documents(tmpdir):
+    file_ = tmpdir.join('_all.yml')
+    file_.write(
+        dedent(
+            '''
+            slug: max-mustermann
+            ---
+            slug: erika-mustermann
+            '''
+        )
+    )
+
+    assert list(iter_yaml_file(file_.strpath)) == [
+        {'slug': 'max-mustermann'},
+        {'slug': 'erika-mustermann'},
+    ]
+
+
+def test_iter_yaml_file_invalid(tmpdir):
+    file_ = tmpdir.join('_all.yml')
+    file_.write('[1, 2, 3]')
+
+    with pytest.raises(LoadError):
+        list(iter_yaml_file(file_.strpath))
+
+
+def test_parse_json_file(tmpdir):
+    file_ = tmpdir.join('author.json')
+    file_.write('{"slug": "max-mustermann", "books": 2}')
+
+    assert parse_json_file(file_.strpath) == {
+        'slug': 'max-mustermann',
+        'books': 2,
+    }
+
+    file_.write('[{"slug": "max-mustermann"}]')
+
+    with pytest.raises(LoadError):
+        parse_json_file(file_.strpath)
+
+
+def test_iter_json_lines_file(tmpdir):
+    file_ = tmpdir.join('_all.jsonl')
+    file_.write('{"slug": "first"}\n\n{"slug": "second"}\n')
+
+    assert list(iter_json_lines_file(file_.strpath)) == [
+        {'slug': 'first'},
+        {'slug': 'second'},
+    ]
+
+    file_.write('{"slug": "first"}\n{"slug": \n')
+
+    with pytest.raises(LoadError, match='line 2'):
+        list(iter_json_lines_file(file_.strpath))
@@ -0,0 +1,86 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table,
+)
+
+from flask_filealchemy import LoadError
+from flask_filealchemy.converters import (
+    convert_column,
+    converter_for,
+    RowConverter,
+)
+
+
+def test_convert_column():
+    assert convert_column(converter_for(Integer()), ['1', '', 2.0]) == [
+        1,
+        None,
+        2,
+    ]
+    assert convert_column(converter_for(Boolean()), ['Yes', 'off']) == [
+        True,
+        False,
+    ]
+    assert convert_column(converter_for(Numeric()), ['1.10', 0.1]) == [
+        Decimal('1.10'),
+        Decimal('0.1'),
+    ]
+    assert convert_column(
+        converter_for(DateTime()), ['2024-01-02T03:04:05']
+    ) == [datetime.datetime(2024, 1, 2, 3, 4, 5)]
+    assert convert_column(converter_for(Date()), [datetime.date.min]) == [
+        datetime.date.min
+    ]
+    assert convert_column(converter_for(String()), [1, 'a']) == ['1', 'a']
+
+
+@pytest.mark.parametrize(
+    'type_, value',
+    [
+        (Integer(), '1.5'),
+        (Integer(), True),
+        (Boolean(), 'maybe'),
+        (String(), ['x', 'y']),
+        (String(), {'x': 'y'}),
+    ],
+)
+def test_convert_invalid(type_, value):
+    with pytest.raises(ValueError):
+        converter_for(type_)(value)
+
+
+def test_row_converter():
+    table = Table(
+        'books',
+        MetaData(),
+        Column('id', Integer, primary_key=True),
+        Column('title', String(255), nullable=False),
+        Column('published', Boolean, nullable=False, default=True),
+    )
+
+    convert = RowConverter(table)
+
+    assert convert('books/first.yml', {'id': None, 'title': 1}) == {
+        'id': None,
+        'title': '1',
+    }
+
+    with pytest.raises(LoadError, match='books/first.yml: invalid title'):
+        convert('books/first.yml', {'id': 1, 'title': ['x', 'y']})
+
+    with pytest.raises(LoadError, match='books/first.yml: missing title'):
+        convert('books/first.yml', {'id': 1})
+
+    with pytest.raises(LoadError, match='books/first.yml: invalid published'):
+        convert('books/first.yml', {'title': 'First', 'published': 'maybe'})
@@ -1,10 +1,23 @@
+import datetime
+import os
+import tracemalloc
 from textwrap import dedent
 
 import pytest
-from sqlalchemy import Column, ForeignKey, String, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    event,
+    ForeignKey,
+    Integer,
+    String,
+    Text,
+)
+from sqlalchemy.orm import deferred, relationship
 
 from flask_filealchemy import FileAlchemy, LoadError
+from flask_filealchemy.content import ContentReference, DeferredText
 
 
 def test_directory_does_not_exist(db, app):
@@ -330,3 +343,967 @@ def test_load_markdown_optional_fields(db, app, tmpdir):
         assert book.title == 'Example'
         assert book.slug == 'example'
         assert book.category is None
+
+
+def test_load_markdown_deferred_content(db, app, tmpdir):
+    class Book(db.Model):
+        __tablename__ = 'books'
+
+        slug = Column(String(255), primary_key=True)
+        title = Column(String(255), nullable=False)
+        content = deferred(Column(DeferredText, default=None))
+
+    data_dir = tmpdir.mkdir('data_dir')
+    books_dir = data_dir.mkdir('books')
+
+    books_dir.join('first.md').write_text(
+        dedent(
+            '''
+            ---
+            slug: first
+            title: Fïrst book
+            ---
+
+            Thé first book!
+
+            It has two paragraphs.
+            '''
+        ),
+        encoding='utf-8',
+    )
+    books_dir.join('second.md').write(
+        dedent(
+            '''
+            ---
+            slug: second
+            title: Second book
+            ---
+            '''
+        )
+    )
+
+    app.config['FILEALCHEMY_MODELS'] = (Book,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        stored = db.session.execute(
+            db.text("SELECT content FROM books WHERE slug = 'first'")
+        ).scalar()
+        reference = ContentReference.loads(stored)
+
+        assert reference.path == 'books/first.md'
+
+        first = db.session.get(Book, 'first')
+        assert first.title == 'Fïrst book'
+        assert first.content == 'Thé first book!\n\nIt has two paragraphs.'
+
+        assert db.session.get(Book, 'second').content == ''
+
+    # edited, but not synced yet
+    books_dir.join('first.md').write_text(
+        dedent(
+            '''
+            ---
+            slug: first
+            title: A much longer title for the first book
+            ---
+
+            Thé first book, revised.
+            '''
+        ),
+        encoding='utf-8',
+    )
+
+    # make sure the modification time differs from the loaded one
+    first_path = books_dir.join('first.md').strpath
+    stat = os.stat(first_path)
+    os.utime(first_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    with app.app_context():
+        first = db.session.get(Book, 'first')
+        assert first.content == 'Thé first book, revised.'
+
+
+def test_load_json(db, app, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+        born = Column(Date)
+
+    class Book(db.Model):
+        __tablename__ = 'books'
+
+        slug = Column(String(255), primary_key=True)
+        title = Column(String(255), nullable=False)
+        author_slug = Column(
+            String(255), ForeignKey('authors.slug'), nullable=False
+        )
+
+        published = Column(Date)
+
+        author = relationship('Author', backref='books')
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    data_dir.mkdir('authors').join('max-mustermann.json').write(
+        '{"slug": "max-mustermann", "name": "Max Mustermann", '
+        '"born": "1970-01-01"}'
+    )
+    books = data_dir.mkdir('books').join('_all.jsonl')
+    books.write(
+        '{"slug": "first-book", "title": "First Book", '
+        '"author_slug": "max-mustermann", "published": "2020-02-01"}\n'
+        '{"slug": "second-book", "title": "Second Book", '
+        '"author_slug": "max-mustermann"}\n'
+    )
+
+    app.config['FILEALCHEMY_MODELS'] = (Author, Book)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        author = db.session.get(Author, 'max-mustermann')
+
+        assert author.born == datetime.date(1970, 1, 1)
+        assert sorted(book.title for book in author.books) == [
+            'First Book',
+            'Second Book',
+        ]
+
+        first_book = db.session.get(Book, 'first-book')
+        assert first_book.published == datetime.date(2020, 2, 1)
+
+        db.drop_all()
+
+    books.write(
+        '{"slug": "first-book", "title": "First Book", '
+        '"author_slug": "max-mustermann", "published": "soon"}\n'
+    )
+
+    with pytest.raises(LoadError, match='_all.jsonl: invalid published'):
+        FileAlchemy(app, db).load_tables()
+
+
+def test_load_csv(db, app, tmpdir):
+    class Country(db.Model):
+        __tablename__ = 'countries'
+
+        code = Column(String(2), primary_key=True)
+        name = Column(String(255), nullable=False)
+        population = Column(Integer)
+        landlocked = Column(Boolean, nullable=False, default=False)
+        founded = Column(Date)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    countries = data_dir.mkdir('countries').join('_all.csv')
+    countries.write(
+        'code,name,population,landlocked,founded,motto\n'
+        'DE,Germany,83000000,false,1949-05-23,\n'
+        'AT,Austria,9000000,yes,,\n'
+        'XX,Nowhere,,,,\n'
+    )
+
+    app.config['FILEALCHEMY_MODELS'] = (Country,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_BATCH_SIZE'] = 2
+
+    file_alchemy = FileAlchemy(app, db)
+    file_alchemy.load_tables()
+
+    assert file_alchemy.file_keys == {
+        'countries/_all.csv': [('DE',), ('AT',), ('XX',)]
+    }
+
+    with app.app_context():
+        germany = db.session.get(Country, 'DE')
+
+        assert germany.population == 83000000
+        assert germany.landlocked is False
+        assert germany.founded == datetime.date(1949, 5, 23)
+
+        austria = db.session.get(Country, 'AT')
+
+        assert austria.landlocked is True
+        assert austria.founded is None
+
+        nowhere = db.session.get(Country, 'XX')
+
+        assert nowhere.population is None
+        assert nowhere.landlocked is False
+
+        db.drop_all()
+
+    countries.write('code,name,population\nDE,Germany,many\n')
+
+    with pytest.raises(LoadError, match='_all.csv: invalid population'):
+        FileAlchemy(app, db).load_tables()
+
+    app.config['FILEALCHEMY_BATCH_SIZE'] = 1000
+
+    countries.write(
+        'code,name\n'
+        + ''.join(
+            'C{0},Country {0}{1}\n'.format(index, ',extra' * (index == 2))
+            for index in range(9)
+        )
+    )
+
+    with pytest.raises(LoadError, match='_all.csv line 4: expected 2 fields'):
+        FileAlchemy(app, db).load_tables()
+
+    countries.write('Code,Name\nDE,Germany\n')
+
+    with pytest.raises(LoadError, match='no columns of countries'):
+        FileAlchemy(app, db).load_tables()
+
+    # as exported by spreadsheet applications
+    countries.write_binary(b'\xef\xbb\xbfcode,name\nDE,Germany\n')
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        assert db.session.get(Country, 'DE').name == 'Germany'
+
+
+def test_load_parquet(db, app, tmpdir):
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+
+    class Country(db.Model):
+        __tablename__ = 'countries'
+
+        code = Column(String(2), primary_key=True)
+        name = Column(String(255), nullable=False)
+        population = Column(Integer)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    pq.write_table(
+        pa.table({'code': ['DE', 'AT'], 'name': ['Germany', 'Austria']}),
+        data_dir.mkdir('countries').join('_all.parquet').strpath,
+    )
+
+    app.config['FILEALCHEMY_MODELS'] = (Country,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        austria = db.session.get(Country, 'AT')
+
+        assert austria.name == 'Austria'
+        assert austria.population is None
+
+
+def test_validate(db, app, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+        born = Column(Date)
+        books = Column(Integer)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    authors_dir.join('max-mustermann.yml').write(
+        'slug: max-mustermann\nname: Max Mustermann\nborn: "1970-01-01"\n'
+    )
+
+    app.config['FILEALCHEMY_MODELS'] = (Author,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_VALIDATE'] = True
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        author = db.session.get(Author, 'max-mustermann')
+        assert author.born == datetime.date(1970, 1, 1)
+
+        db.drop_all()
+
+    erika_mustermann = authors_dir.join('erika-mustermann.yml')
+    erika_mustermann.write('slug: erika-mustermann\nbooks: many\n')
+
+    with pytest.raises(LoadError, match='erika-mustermann.yml: missing name'):
+        FileAlchemy(app, db).load_tables()
+
+    erika_mustermann.write(
+        'slug: erika-mustermann\nname: Erika Mustermann\nbooks: many\n'
+    )
+
+    with pytest.raises(
+        LoadError, match='erika-mustermann.yml: invalid books'
+    ):
+        FileAlchemy(app, db).load_tables()
+
+
+def test_check_integrity(db, app, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    class Book(db.Model):
+        __tablename__ = 'books'
+
+        slug = Column(String(255), primary_key=True)
+        title = Column(String(255), nullable=False)
+        author_slug = Column(
+            String(255), ForeignKey('authors.slug'), nullable=False
+        )
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    books_dir = data_dir.mkdir('books')
+
+    authors_dir.join('max-mustermann.yml').write(
+        'slug: max-mustermann\nname: Max Mustermann\n'
+    )
+    books_dir.join('first-book.yml').write(
+        'slug: first-book\ntitle: First Book\nauthor_slug: erika-mustermann\n'
+    )
+
+    app.config['FILEALCHEMY_MODELS'] = (Author, Book)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_CHECK_INTEGRITY'] = True
+
+    with pytest.raises(
+        LoadError,
+        match="first-book.yml: author_slug refers to missing authors "
+        "'erika-mustermann'",
+    ):
+        FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        db.drop_all()
+
+    books_dir.join('first-book.yml').write(
+        'slug: first-book\ntitle: First Book\nauthor_slug: max-mustermann\n'
+    )
+    authors_dir.join('max.yml').write('slug: max-mustermann\nname: Max\n')
+
+    with pytest.raises(LoadError, match='duplicate authors'):
+        FileAlchemy(app, db).load_tables()
+
+
+def test_check_integrity_autoincrement(db, app, tmpdir):
+    class Tag(db.Model):
+        __tablename__ = 'tags'
+
+        id = Column(Integer, primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    tags_dir = data_dir.mkdir('tags')
+    tags_dir.join('a.yml').write('name: a\n')
+    tags_dir.join('b.yml').write('name: b\n')
+
+    app.config['FILEALCHEMY_MODELS'] = (Tag,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_CHECK_INTEGRITY'] = True
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        assert len(db.session.execute(db.select(Tag)).all()) == 2
+
+
+def test_check_integrity_converted_keys(db, app, tmpdir):
+    class Year(db.Model):
+        __tablename__ = 'years'
+
+        slug = Column(String(255), primary_key=True)
+
+    class Event(db.Model):
+        __tablename__ = 'events'
+
+        slug = Column(String(255), primary_key=True)
+        year_slug = Column(String(255), ForeignKey('years.slug'))
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    data_dir.mkdir('years').join('y.yml').write('slug: 2020\n')
+    data_dir.mkdir('events').join('e.yml').write(
+        'slug: e\nyear_slug: "2020"\n'
+    )
+
+    app.config['FILEALCHEMY_MODELS'] = (Year, Event)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_CHECK_INTEGRITY'] = True
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        assert db.session.get(Event, 'e').year_slug == '2020'
+
+
+def test_bulk_insert(db, app, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+        country = Column(String(255), default='Germany')
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+
+    for index in range(5):
+        authors_dir.join('author-{}.yml'.format(index)).write(
+            dedent(
+                '''
+                slug: author-{0}
+                name: Author {0}
+                '''.format(index)
+            )
+        )
+
+    app.config['FILEALCHEMY_MODELS'] = (Author,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_BULK_INSERT'] = True
+    app.config['FILEALCHEMY_BATCH_SIZE'] = 2
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        authors = db.session.execute(db.select(Author)).scalars().all()
+
+        assert len(authors) == 5
+        assert all(author.country == 'Germany' for author in authors)
+
+
+def test_bulk_insert_autoincrement(db, app, tmpdir):
+    class Tag(db.Model):
+        __tablename__ = 'tags'
+
+        id = Column(Integer, primary_key=True)
+        name = Column(String(255), nullable=False)
+        note = Column(String(255))
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    tags_dir = data_dir.mkdir('tags')
+    tags_dir.join('a.yml').write('name: a\n')
+    tags_dir.join('b.yml').write('name: b\nnote: second\n')
+
+    app.config['FILEALCHEMY_MODELS'] = (Tag,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_BULK_INSERT'] = True
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if statement.startswith('INSERT'):
+            statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    FileAlchemy(app, db).load_tables()
+
+    # like the ORM, leave the autoincrement column to the database instead
+    # of inserting NULL (which e.g. PostgreSQL identity columns reject)
+    assert statements
+    assert all('id' not in statement.split('(')[1] for statement in statements)
+
+    with app.app_context():
+        tags = db.session.execute(db.select(Tag.id, Tag.name)).all()
+        assert sorted(name for _, name in tags) == ['a', 'b']
+        assert sorted(id_ for id_, _ in tags) == [1, 2]
+
+
+def test_bulk_insert_integrity_error(db, app, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    authors_dir.join('first.yml').write('slug: max-mustermann')
+
+    app.config['FILEALCHEMY_MODELS'] = (Author,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_BULK_INSERT'] = True
+
+    with pytest.raises(LoadError):
+        FileAlchemy(app, db).load_tables()
+
+
+def test_load_with_workers(db, app, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    class Book(db.Model):
+        __tablename__ = 'books'
+
+        slug = Column(String(255), primary_key=True)
+        title = Column(String(255), nullable=False)
+        content = Column(Text, default=None)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    books_dir = data_dir.mkdir('books')
+
+    for index in range(20):
+        authors_dir.join('author-{}.yml'.format(index)).write(
+            'slug: author-{0}\nname: Author {0}\n'.format(index)
+        )
+        books_dir.join('book-{}.md'.format(index)).write(
+            '---\nslug: book-{0}\ntitle: Book {0}\n---\n\nBook {0}\n'.format(
+                index
+            )
+        )
+
+    app.config['FILEALCHEMY_MODELS'] = (Author, Book)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_WORKERS'] = 2
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        assert len(db.session.execute(db.select(Author)).all()) == 20
+
+        book = db.session.execute(
+            db.select(Book).filter_by(slug='book-7')
+        ).scalar_one()
+        assert book.content == 'Book 7'
+
+
+def test_load_with_parse_cache(db, app, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    authors_dir.join('max-mustermann.yml').write(
+        'slug: max-mustermann\nname: Max Mustermann\n'
+    )
+
+    app.config['FILEALCHEMY_MODELS'] = (Author,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_CACHE_PATH'] = tmpdir.join('cache.db').strpath
+
+    for _ in range(2):
+        FileAlchemy(app, db).load_tables()
+
+        with app.app_context():
+            author = db.session.execute(db.select(Author)).scalar_one()
+            assert author.name == 'Max Mustermann'
+
+            db.drop_all()
+
+
+def test_restore_snapshot(db, app, tmpdir, monkeypatch):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    max_mustermann = authors_dir.join('max-mustermann.yml')
+    max_mustermann.write('slug: max-mustermann\nname: Max Mustermann\n')
+
+    snapshot_path = tmpdir.join('snapshot.db')
+
+    app.config['FILEALCHEMY_MODELS'] = (Author,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_SNAPSHOT_PATH'] = snapshot_path.strpath
+
+    FileAlchemy(app, db).load_tables()
+
+    assert snapshot_path.exists()
+
+    with app.app_context():
+        db.drop_all()
+
+    # a changed data directory must not restore the stale snapshot
+    authors_dir.join('erika-mustermann.yml').write(
+        'slug: erika-mustermann\nname: Erika Mustermann\n'
+    )
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        assert len(db.session.execute(db.select(Author)).all()) == 2
+
+        db.drop_all()
+
+    def load_table(*args, **kwargs):
+        raise AssertionError('snapshot was not restored')
+
+    monkeypatch.setattr(FileAlchemy, 'load_table', load_table)
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        assert len(db.session.execute(db.select(Author)).all()) == 2
+
+
+def test_sync(db, app, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    class Book(db.Model):
+        __tablename__ = 'books'
+
+        slug = Column(String(255), primary_key=True)
+        title = Column(String(255), nullable=False)
+        author_slug = Column(
+            String(255), ForeignKey('authors.slug'), nullable=False
+        )
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    books_dir = data_dir.mkdir('books')
+
+    max_mustermann = authors_dir.join('max-mustermann.yml')
+    max_mustermann.write('slug: max-mustermann\nname: Max Mustermann\n')
+
+    first_book = books_dir.join('first-book.yml')
+    first_book.write(
+        'slug: first-book\ntitle: First Book\nauthor_slug: max-mustermann\n'
+    )
+
+    app.config['FILEALCHEMY_MODELS'] = (Author, Book)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+
+    file_alchemy = FileAlchemy(app, db)
+    file_alchemy.load_tables()
+
+    assert not file_alchemy.sync()
+
+    # add a new author with a book, modify one, and remove the old author
+    authors_dir.join('erika-mustermann.yml').write(
+        'slug: erika-mustermann\nname: Erika Mustermann\n'
+    )
+    first_book.write(
+        'slug: first-book\ntitle: Updated\nauthor_slug: erika-mustermann\n'
+    )
+    max_mustermann.remove()
+
+    assert file_alchemy.sync()
+
+    with app.app_context():
+        authors = db.session.execute(db.select(Author.slug)).scalars().all()
+        assert authors == ['erika-mustermann']
+
+        book = db.session.execute(db.select(Book)).scalar_one()
+        assert book.title == 'Updated'
+        assert book.author_slug == 'erika-mustermann'
+
+
+def test_sync_autoincrement(db, app, tmpdir):
+    class Tag(db.Model):
+        __tablename__ = 'tags'
+
+        id = Column(Integer, primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    tags_dir = data_dir.mkdir('tags')
+
+    a = tags_dir.join('a.yml')
+    a.write('name: a\n')
+
+    b = tags_dir.join('b.yml')
+    b.write('name: b\n')
+
+    app.config['FILEALCHEMY_MODELS'] = (Tag,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+
+    file_alchemy = FileAlchemy(app, db)
+    file_alchemy.load_tables()
+
+    a.write('name: a-edited\n')
+    b.remove()
+
+    assert file_alchemy.sync()
+
+    with app.app_context():
+        names = db.session.execute(db.select(Tag.name)).scalars().all()
+        assert names == ['a-edited']
+
+    tags_dir.join('c.yml').write('name: c\n')
+
+    assert file_alchemy.sync()
+
+    with app.app_context():
+        names = db.session.execute(db.select(Tag.name)).scalars().all()
+        assert sorted(names) == ['a-edited', 'c']
+
+
+def test_yaml_stream_all_file(db, app, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    all_ = authors_dir.join('_all.yml')
+
+    all_.write(
+        ''.join(
+            '- slug: author-{0}\n  name: Author {0}\n'.format(index)
+            for index in range(50)
+        )
+    )
+
+    app.config['FILEALCHEMY_MODELS'] = (Author,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_BULK_INSERT'] = True
+    app.config['FILEALCHEMY_BATCH_SIZE'] = 8
+    app.config['FILEALCHEMY_STREAM_SIZE'] = 0
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        assert len(db.session.execute(db.select(Author)).all()) == 50
+
+
+def test_lazy_load(db, app, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    class Book(db.Model):
+        __tablename__ = 'books'
+
+        slug = Column(String(255), primary_key=True)
+        title = Column(String(255), nullable=False)
+        author_slug = Column(
+            String(255), ForeignKey('authors.slug'), nullable=False
+        )
+
+        author = relationship('Author', backref='books')
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    books_dir = data_dir.mkdir('books')
+
+    authors_dir.join('max-mustermann.yml').write(
+        'slug: max-mustermann\nname: Max Mustermann\n'
+    )
+    books_dir.join('first-book.yml').write(
+        'slug: first-book\ntitle: First Book\nauthor_slug: max-mustermann\n'
+    )
+
+    app.config['FILEALCHEMY_MODELS'] = (Author, Book)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_LAZY'] = True
+
+    file_alchemy = FileAlchemy(app, db)
+    file_alchemy.load_tables()
+
+    assert file_alchemy.pending == {'authors', 'books'}
+
+    with app.app_context():
+        assert len(db.session.execute(db.select(Author)).all()) == 1
+        assert file_alchemy.pending == {'books'}
+
+        book = db.session.execute(db.select(Book)).scalar_one()
+
+        assert file_alchemy.pending == set()
+        assert book.author.name == 'Max Mustermann'
+
+
+def test_query_cache(db, app, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    class Book(db.Model):
+        __tablename__ = 'books'
+
+        slug = Column(String(255), primary_key=True)
+        title = Column(String(255), nullable=False)
+        author_slug = Column(
+            String(255), ForeignKey('authors.slug'), nullable=False
+        )
+
+        author = relationship('Author', backref='books')
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    books_dir = data_dir.mkdir('books')
+
+    authors_dir.join('max-mustermann.yml').write(
+        'slug: max-mustermann\nname: Max Mustermann\n'
+    )
+    books_dir.join('first-book.yml').write(
+        'slug: first-book\ntitle: First Book\nauthor_slug: max-mustermann\n'
+    )
+
+    app.config['FILEALCHEMY_MODELS'] = (Author, Book)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_QUERY_CACHE_SIZE'] = 16
+
+    file_alchemy = FileAlchemy(app, db)
+    file_alchemy.load_tables()
+
+    query_cache = file_alchemy.query_cache
+
+    def titles():
+        with app.app_context():
+            return [
+                book.title
+                for book in db.session.execute(
+                    db.select(Book).order_by(Book.slug)
+                ).scalars()
+            ]
+
+    assert titles() == ['First Book']
+    assert (query_cache.hits, query_cache.misses) == (0, 1)
+
+    assert titles() == ['First Book']
+    assert (query_cache.hits, query_cache.misses) == (1, 1)
+
+    with app.app_context():
+        book = db.session.execute(db.select(Book)).scalar_one()
+        assert book.author.name == 'Max Mustermann'
+
+    books_dir.join('second-book.yml').write(
+        'slug: second-book\ntitle: Second Book\n'
+        'author_slug: max-mustermann\n'
+    )
+
+    version = query_cache.version
+
+    assert file_alchemy.sync()
+    assert query_cache.version > version
+
+    assert titles() == ['First Book', 'Second Book']
+
+
+def test_load_tables_concurrently(db, app, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    class Publisher(db.Model):
+        __tablename__ = 'publishers'
+
+        slug = Column(String(255), primary_key=True)
+
+    class Book(db.Model):
+        __tablename__ = 'books'
+
+        slug = Column(String(255), primary_key=True)
+        author_slug = Column(
+            String(255), ForeignKey('authors.slug'), nullable=False
+        )
+        publisher_slug = Column(
+            String(255), ForeignKey('publishers.slug'), nullable=False
+        )
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    publishers_dir = data_dir.mkdir('publishers')
+    books_dir = data_dir.mkdir('books')
+
+    for index in range(10):
+        authors_dir.join('author-{}.yml'.format(index)).write(
+            'slug: author-{0}\nname: Author {0}\n'.format(index)
+        )
+        publishers_dir.join('publisher-{}.yml'.format(index)).write(
+            'slug: publisher-{}\n'.format(index)
+        )
+        books_dir.join('book-{}.yml'.format(index)).write(
+            'slug: book-{0}\n'
+            'author_slug: author-{0}\n'
+            'publisher_slug: publisher-{0}\n'.format(index)
+        )
+
+    app.config['FILEALCHEMY_MODELS'] = (Author, Publisher, Book)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_TABLE_WORKERS'] = 3
+    app.config['FILEALCHEMY_CACHE_PATH'] = tmpdir.join('cache.db').strpath
+
+    FileAlchemy(app, db).load_tables()
+
+    with app.app_context():
+        assert len(db.session.execute(db.select(Author)).all()) == 10
+        assert len(db.session.execute(db.select(Publisher)).all()) == 10
+        assert len(db.session.execute(db.select(Book)).all()) == 10
+
+
+def test_low_memory(db, app, tmpdir):
+    class Book(db.Model):
+        __tablename__ = 'books'
+
+        slug = Column(String(255), primary_key=True)
+        content = Column(Text, default=None)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    books_dir = data_dir.mkdir('books')
+
+    # 300 books of 20 KB each
+    for index in range(300):
+        books_dir.join('book-{}.md'.format(index)).write(
+            '---\nslug: book-{}\n---\n\n{}\n'.format(index, 'x' * 20000)
+        )
+
+    app.config['FILEALCHEMY_MODELS'] = (Book,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_LOW_MEMORY'] = True
+    app.config['FILEALCHEMY_BATCH_SIZE'] = 20
+
+    file_alchemy = FileAlchemy(app, db)
+
+    tracemalloc.start()
+
+    try:
+        file_alchemy.load_tables()
+
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # only a few batches worth of the 6 MB of content are held at once
+    assert peak < 2 * 1000 * 1000
+
+    with app.app_context():
+        assert len(db.session.execute(db.select(Book.slug)).all()) == 300
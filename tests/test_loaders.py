@@ -5,16 +5,23 @@ from sqlalchemy import Column, String
 
 from flask_filealchemy.loaders import (
     BaseLoader,
+    CSVFileLoader,
+    DirectoryListing,
+    JSONDirectoryLoader,
+    JSONLinesFileLoader,
     loader_for,
+    LOADERS,
     MarkdownFrontmatterDirectoryLoader,
+    register_loader,
+    RowMapper,
     YAMLDirectoryLoader,
     YAMLFileLoader,
 )
 
 
-def test_base_loader_does_not_validate():
+def test_base_loader_does_not_validate(tmpdir):
     with pytest.raises(NotImplementedError):
-        BaseLoader(None, None)
+        BaseLoader.matches(DirectoryListing(Path(tmpdir.strpath)))
 
 
 def test_yaml_file_loader(db, tmpdir):
@@ -37,6 +44,50 @@ def test_yaml_file_loader(db, tmpdir):
     )
 
 
+def test_csv_file_loader(db, tmpdir):
+    authors = tmpdir.mkdir('authors')
+    authors.join('_all.csv').write('slug,name\n')
+
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    author_table = db.metadata.sorted_tables[0]
+
+    assert isinstance(
+        loader_for(Path(tmpdir.strpath), author_table), CSVFileLoader
+    )
+
+
+def test_json_loaders(db, tmpdir):
+    authors = tmpdir.mkdir('authors')
+    authors.join('first.json').write('does-not-matter')
+
+    books = tmpdir.mkdir('books')
+    books.join('_all.jsonl').write('does-not-matter')
+
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+
+    class Book(db.Model):
+        __tablename__ = 'books'
+
+        slug = Column(String(255), primary_key=True)
+
+    data_dir = Path(tmpdir.strpath)
+
+    assert isinstance(
+        loader_for(data_dir, Author.__table__), JSONDirectoryLoader
+    )
+    assert isinstance(
+        loader_for(data_dir, Book.__table__), JSONLinesFileLoader
+    )
+
+
 def test_no_loader_found(db, tmpdir):
     authors = tmpdir.mkdir('authors')
 
@@ -151,3 +202,78 @@ def test_markdown_frontmatter_loader_with_extra_extensions(db, tmpdir):
         loader_for(Path(tmpdir.strpath), author_table),
         MarkdownFrontmatterDirectoryLoader,
     )
+
+
+def test_missing_directory(db, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    author_table = db.metadata.sorted_tables[0]
+
+    assert not loader_for(Path(tmpdir.strpath), author_table)
+
+
+def test_directory_listing(tmpdir):
+    authors = tmpdir.mkdir('authors')
+
+    authors.join('first.yml').write('does-not-matter')
+    authors.mkdir('nested')
+
+    listing = DirectoryListing(Path(authors.strpath))
+
+    assert listing.exists
+    assert sorted(listing.names) == ['first.yml', 'nested']
+    assert listing.files == {
+        'first.yml': '{}/first.yml'.format(Path(authors.strpath).as_posix())
+    }
+
+
+def test_row_mapper(db):
+    class Book(db.Model):
+        __tablename__ = 'books'
+
+        slug = Column(String(255), primary_key=True)
+        title = Column(String(255), nullable=False)
+        content = Column(String(255))
+
+    book_table = db.metadata.sorted_tables[0]
+
+    assert RowMapper(book_table)({'slug': 'first', 'extra': 1}) == {
+        'slug': 'first',
+        'title': None,
+        'content': None,
+    }
+
+    assert RowMapper(book_table, 'content')(
+        {'slug': 'first', 'content': 'ignored'}, 'Content'
+    ) == {'slug': 'first', 'title': None, 'content': 'Content'}
+
+
+def test_register_loader(db, tmpdir, monkeypatch):
+    monkeypatch.setattr('flask_filealchemy.loaders.LOADERS', list(LOADERS))
+
+    authors = tmpdir.mkdir('authors')
+    authors.join('first.toml').write('does-not-matter')
+
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    author_table = db.metadata.sorted_tables[0]
+
+    assert not loader_for(Path(tmpdir.strpath), author_table)
+
+    @register_loader
+    class TOMLDirectoryLoader(BaseLoader):
+        @classmethod
+        def matches(cls, listing):
+            return listing.extensions == {'.toml'}
+
+    assert isinstance(
+        loader_for(Path(tmpdir.strpath), author_table), TOMLDirectoryLoader
+    )
@@ -0,0 +1,32 @@
+from flask_filealchemy.query_cache import QueryCache
+
+
+def test_query_cache_evicts_least_recently_used():
+    cache = QueryCache(max_size=2)
+
+    for name in ('first', 'second'):
+        cache.set((cache.version, name), name)
+
+    assert cache.get((cache.version, 'first')) == 'first'
+
+    cache.set((cache.version, 'third'), 'third')
+
+    assert len(cache) == 2
+    assert cache.get((cache.version, 'second')) is None
+    assert cache.get((cache.version, 'first')) == 'first'
+
+
+def test_query_cache_invalidate():
+    cache = QueryCache()
+
+    stale = (cache.version, 'first')
+    cache.set(stale, 'first')
+    cache.invalidate()
+
+    assert len(cache) == 0
+
+    # results of statements which were running during the invalidation
+    # aren't kept around
+    cache.set(stale, 'first')
+
+    assert len(cache) == 0
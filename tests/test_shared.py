@@ -0,0 +1,80 @@
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import Column, String
+from sqlalchemy.exc import OperationalError
+
+from flask_filealchemy import FileAlchemy, LoadError
+from flask_filealchemy.shared import (
+    SHARED_ENGINE_OPTIONS,
+    shared_database_uri,
+)
+
+
+def test_shared_database(tmpdir, monkeypatch):
+    db = SQLAlchemy()
+
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    authors_dir.join('max-mustermann.yml').write(
+        'slug: max-mustermann\nname: Max Mustermann\n'
+    )
+
+    shared_path = tmpdir.join('shared.db').strpath
+
+    def make_app():
+        app = Flask(__name__)
+
+        app.config['SQLALCHEMY_DATABASE_URI'] = shared_database_uri(
+            shared_path
+        )
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = SHARED_ENGINE_OPTIONS
+        app.config['FILEALCHEMY_MODELS'] = (Author,)
+        app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+        app.config['FILEALCHEMY_SHARED_PATH'] = shared_path
+
+        db.init_app(app)
+
+        return app
+
+    first_app = make_app()
+    first = FileAlchemy(first_app, db)
+    first.load_tables()
+
+    assert first.file_keys == {
+        'authors/max-mustermann.yml': [('max-mustermann',)]
+    }
+
+    def load_all(*args, **kwargs):
+        raise AssertionError('shared database was loaded again')
+
+    monkeypatch.setattr(FileAlchemy, 'load_all', load_all)
+
+    # the second "worker" attaches to the database the first one built
+    second_app = make_app()
+    second = FileAlchemy(second_app, db)
+    second.after_fork()
+    second.load_tables()
+
+    assert second.file_keys == first.file_keys
+
+    with second_app.app_context():
+        author = db.session.get(Author, 'max-mustermann')
+        assert author.name == 'Max Mustermann'
+
+        db.session.add(Author(slug='erika-mustermann', name='Erika'))
+
+        with pytest.raises(OperationalError):
+            db.session.flush()
+
+        db.session.rollback()
+
+    with pytest.raises(LoadError):
+        second.sync()
@@ -0,0 +1,55 @@
+import logging
+
+from sqlalchemy import Column, String
+
+from flask_filealchemy import FileAlchemy
+from flask_filealchemy.signals import table_loaded, tables_loaded
+
+
+def test_load_stats(db, app, tmpdir, caplog):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+
+    for index in range(3):
+        authors_dir.join('author-{}.yml'.format(index)).write(
+            'slug: author-{0}\nname: Author {0}\n'.format(index)
+        )
+
+    app.config['FILEALCHEMY_MODELS'] = (Author,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+    app.config['FILEALCHEMY_LOG_SUMMARY'] = True
+
+    received = []
+
+    def on_table_loaded(sender, stats):
+        received.append(stats)
+
+    def on_tables_loaded(sender, stats):
+        received.append(stats)
+
+    with table_loaded.connected_to(on_table_loaded, app):
+        with tables_loaded.connected_to(on_tables_loaded, app):
+            with caplog.at_level(logging.INFO):
+                FileAlchemy(app, db).load_tables()
+
+    table_stats, load_stats = received
+
+    assert table_stats.table == 'authors'
+    assert table_stats.files == 3
+    assert table_stats.records == 3
+    assert table_stats.bytes == sum(
+        file_.size() for file_ in authors_dir.listdir()
+    )
+    assert set(table_stats.timings) == {'scan', 'parse', 'construct', 'flush'}
+
+    assert load_stats.tables == [table_stats]
+    assert load_stats.timings['commit'] > 0
+
+    assert 'loaded 3 records from 3 files' in caplog.text
@@ -0,0 +1,208 @@
+import threading
+import time
+
+import pytest
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import Column, String, Text
+
+from flask_filealchemy import FileAlchemy
+from flask_filealchemy.watcher import _Handler
+
+
+@pytest.fixture
+def db(app, tmpdir):
+    # syncing in the background needs a connection of its own, which
+    # in-memory databases don't give it
+    sqlalchemy = SQLAlchemy()
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///{}'.format(
+        tmpdir.join('db.sqlite').strpath
+    )
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    sqlalchemy.init_app(app)
+
+    return sqlalchemy
+
+
+def test_watcher_polls_for_changes(db, app, tmpdir):
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    authors_dir.join('max-mustermann.yml').write(
+        'slug: max-mustermann\nname: Max Mustermann\n'
+    )
+
+    app.config['FILEALCHEMY_MODELS'] = (Author,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+
+    file_alchemy = FileAlchemy(app, db)
+    file_alchemy.load_tables()
+
+    watcher = file_alchemy.watch(interval=0.05, poll=True)
+
+    try:
+        authors_dir.join('erika-mustermann.yml').write(
+            'slug: erika-mustermann\nname: Erika Mustermann\n'
+        )
+
+        deadline = time.monotonic() + 5
+
+        while time.monotonic() < deadline:
+            with app.app_context():
+                count = len(db.session.execute(db.select(Author)).all())
+
+            if count == 2:
+                break
+
+            time.sleep(0.05)
+
+        assert count == 2
+    finally:
+        watcher.stop()
+
+
+def test_watcher_survives_failed_syncs(db, app, tmpdir, caplog):
+    class Post(db.Model):
+        __tablename__ = 'posts'
+
+        slug = Column(String(255), primary_key=True)
+        content = Column(Text)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    posts_dir = data_dir.mkdir('posts')
+    posts_dir.join('first.md').write('---\nslug: first\n---\n\nFirst\n')
+
+    app.config['FILEALCHEMY_MODELS'] = (Post,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+
+    file_alchemy = FileAlchemy(app, db)
+    file_alchemy.load_tables()
+
+    watcher = file_alchemy.watch(interval=0.05, poll=True)
+
+    def wait_for(condition):
+        deadline = time.monotonic() + 5
+
+        while time.monotonic() < deadline and not condition():
+            time.sleep(0.05)
+
+        return condition()
+
+    try:
+        second = posts_dir.join('second.md')
+
+        # half-edited front matter
+        second.write('---\nslug: [a\n---\n')
+
+        assert wait_for(
+            lambda: 'could not sync the data directory' in caplog.text
+        )
+
+        second.write('---\nslug: second\n---\n\nSecond\n')
+
+        def synced():
+            with app.app_context():
+                return db.session.get(Post, 'second') is not None
+
+        assert wait_for(synced)
+    finally:
+        watcher.stop()
+
+
+def test_watcher_uses_file_system_events(db, app, tmpdir, caplog):
+    pytest.importorskip('watchdog')
+
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+        name = Column(String(255), nullable=False)
+
+    data_dir = tmpdir.mkdir('data_dir')
+
+    authors_dir = data_dir.mkdir('authors')
+    authors_dir.join('max-mustermann.yml').write(
+        'slug: max-mustermann\nname: Max Mustermann\n'
+    )
+
+    app.config['FILEALCHEMY_MODELS'] = (Author,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+
+    file_alchemy = FileAlchemy(app, db)
+    file_alchemy.load_tables()
+
+    watcher = file_alchemy.watch(debounce=0.05)
+
+    assert 'single connection' not in caplog.text
+
+    try:
+        authors_dir.join('erika-mustermann.yml').write(
+            'slug: erika-mustermann\nname: Erika Mustermann\n'
+        )
+
+        deadline = time.monotonic() + 5
+
+        while time.monotonic() < deadline:
+            with app.app_context():
+                count = len(db.session.execute(db.select(Author)).all())
+
+            if count == 2:
+                break
+
+            time.sleep(0.05)
+
+        assert count == 2
+    finally:
+        watcher.stop()
+
+
+def test_watcher_ignores_reads(tmpdir):
+    events = pytest.importorskip('watchdog.events')
+
+    changed = threading.Event()
+    handler = _Handler(changed)
+
+    path = tmpdir.join('file.yml').strpath
+
+    handler.dispatch(events.FileOpenedEvent(path))
+    handler.dispatch(events.FileClosedNoWriteEvent(path))
+
+    assert not changed.is_set()
+
+    handler.dispatch(events.FileModifiedEvent(path))
+
+    assert changed.is_set()
+
+
+def test_watcher_warns_about_single_connection(app, tmpdir, caplog):
+    db = SQLAlchemy()
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+    db.init_app(app)
+
+    class Author(db.Model):
+        __tablename__ = 'authors'
+
+        slug = Column(String(255), primary_key=True)
+
+    data_dir = tmpdir.mkdir('data_dir')
+    data_dir.mkdir('authors').join('max.yml').write('slug: max\n')
+
+    app.config['FILEALCHEMY_MODELS'] = (Author,)
+    app.config['FILEALCHEMY_DATA_DIR'] = data_dir.strpath
+
+    file_alchemy = FileAlchemy(app, db)
+    file_alchemy.load_tables()
+
+    file_alchemy.watch(interval=0.05, poll=True).stop()
+
+    assert 'single connection' in caplog.text